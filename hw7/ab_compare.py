@@ -0,0 +1,105 @@
+import math
+import json
+import shutil
+import pathlib
+import argparse
+import tempfile
+
+from input_pipeline import InputPipeline
+from campaign_stats import t_critical_95
+from run_test import (run_tests_parallel, make_test_config, generate_input, print_color, Fore, Style,
+                      BASE_DIR, JAR_FILE, MAX_WORKERS)
+
+AB_METRICS = ["T_run", "WT", "W"] # 均为越小越好
+AB_REPORT_FILENAME = "ab_report.json"
+
+def sign_test_p(diffs):
+    """精确双侧符号检验 p 值 (忽略差为 0 的配对)"""
+    nonzero = [d for d in diffs if d != 0]; n = len(nonzero)
+    if n == 0: return 1.0
+    k = min(sum(1 for d in nonzero if d > 0), sum(1 for d in nonzero if d < 0))
+    tail = sum(math.comb(n, i) for i in range(k + 1)) / 2 ** n
+    return min(1.0, 2 * tail)
+
+def paired_summary(a_values, b_values):
+    """配对差 d = B - A 的统计: 均值, 95% CI, 相对变化, B 更优/更差次数, 符号检验 p 值"""
+    diffs = [b - a for a, b in zip(a_values, b_values)]; n = len(diffs)
+    if n == 0: return {"n": 0}
+    mean = sum(diffs) / n
+    stdev = math.sqrt(sum((d - mean) ** 2 for d in diffs) / (n - 1)) if n > 1 else 0.0
+    half = t_critical_95(n - 1) * stdev / math.sqrt(n) if n > 1 else None
+    mean_a = sum(a_values) / n
+    return {"n": n, "mean_a": mean_a, "mean_b": sum(b_values) / n, "mean_diff": mean, "stdev_diff": stdev,
+            "ci95": [mean - half, mean + half] if half is not None else None,
+            "relative_change": mean / mean_a if mean_a else None,
+            "b_better": sum(1 for d in diffs if d < 0), "b_worse": sum(1 for d in diffs if d > 0),
+            "sign_test_p": sign_test_p(diffs)}
+
+def run_ab(jar_a, jar_b, mode, num_inputs, workers=MAX_WORKERS, work_dir=None):
+    """在 num_inputs 个相同的随机输入上交替运行 A/B 两个 jar, 返回 (配对记录, 各指标统计)"""
+    work_dir = pathlib.Path(work_dir)
+    pipeline = InputPipeline(((i, make_test_config(mode)) for i in range(num_inputs)), work_dir, generate_input, longest_first=False).start()
+    inputs = [(config, pathlib.Path(config['stdin_file'])) for _, config, _ in pipeline if 'stdin_file' in config]
+    jobs = []
+    for i, (config, path) in enumerate(inputs): # 同一输入的 A/B 相邻提交且交替先后, 使两者处于相近的机器负载下
+        pair = [("A", jar_a), ("B", jar_b)] if i % 2 == 0 else [("B", jar_b), ("A", jar_a)]
+        for tag, jar in pair:
+            jobs.append((f"ab{tag}{i}", {'type': mode, 'stdin_file': str(path), 'jar_file': str(jar), 'save_artifacts': False}))
+    print_color(f"--- A/B 对比: {len(inputs)} 个输入 x 2 个 jar, 并行数 {workers} ---", Style.BRIGHT)
+    results = run_tests_parallel(jobs, work_dir, max_workers=workers)
+    by_key = {job[0]: result for job, result in zip(jobs, results)}
+
+    pairs = []
+    for i, (config, path) in enumerate(inputs):
+        result_a = by_key[f"abA{i}"]; result_b = by_key[f"abB{i}"]
+        pairs.append({"input": i, "seed": config['seed'], "config": config,
+                      "status_a": result_a.get("status"), "status_b": result_b.get("status"),
+                      "perf_a": result_a.get("performance"), "perf_b": result_b.get("performance")})
+    both_pass = [p for p in pairs if p["status_a"] == "PASS" and p["status_b"] == "PASS" and p["perf_a"] and p["perf_b"]]
+    summary = {}
+    for metric in AB_METRICS:
+        valid = [p for p in both_pass if math.isfinite(p["perf_a"][metric]) and math.isfinite(p["perf_b"][metric])]
+        summary[metric] = paired_summary([p["perf_a"][metric] for p in valid], [p["perf_b"][metric] for p in valid])
+    return pairs, summary
+
+def print_ab_report(pairs, summary):
+    pass_a = sum(1 for p in pairs if p["status_a"] == "PASS"); pass_b = sum(1 for p in pairs if p["status_b"] == "PASS")
+    print("\n" + "=" * 20 + " A/B 对比结果 (差值 = B - A, 越小越好) " + "=" * 20)
+    print(f"通过: A {pass_a}/{len(pairs)}, B {pass_b}/{len(pairs)}")
+    for p in pairs:
+        if p["status_a"] != p["status_b"]:
+            print_color(f"  输入 {p['input']} (seed {p['seed']}): A {p['status_a']}, B {p['status_b']}", Fore.YELLOW)
+    print(f"  {'指标':<7}{'n':>5}{'A 均值':>10}{'B 均值':>10}{'差值':>10}{'95% CI':>22}{'相对':>9}{'B优/B劣':>9}{'符号检验 p':>12}")
+    for metric, s in summary.items():
+        if not s.get("n"): print(f"  {metric:<7}{0:>5}  (无双方均通过的输入)"); continue
+        ci = f"[{s['ci95'][0]:+.3f}, {s['ci95'][1]:+.3f}]" if s["ci95"] else "-"
+        rel = f"{s['relative_change']:+.1%}" if s["relative_change"] is not None else "-"
+        significant = s["ci95"] is not None and (s["ci95"][1] < 0 or s["ci95"][0] > 0)
+        color = (Fore.GREEN if s["mean_diff"] < 0 else Fore.RED) if significant else Fore.WHITE
+        print_color(f"  {metric:<7}{s['n']:>5}{s['mean_a']:>10.3f}{s['mean_b']:>10.3f}{s['mean_diff']:>+10.3f}{ci:>22}{rel:>9}"
+                    f"{str(s['b_better']) + '/' + str(s['b_worse']):>9}{s['sign_test_p']:>12.4f}", color)
+    print("CI 不含 0 视为显著 (绿色: B 显著更好, 红色: B 显著更差)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HW7 两个 jar 的配对 A/B 性能对比")
+    parser.add_argument("jar_b", help="新版本 jar (B)")
+    parser.add_argument("--baseline", default=str(JAR_FILE), help="基线 jar (A, 默认 code.jar)")
+    parser.add_argument("--mode", choices=["public", "mutual"], default="public")
+    parser.add_argument("-n", "--inputs", type=int, default=20, help="输入数量")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--output", help=f"报告 JSON (默认 {AB_REPORT_FILENAME})")
+    args = parser.parse_args()
+
+    for jar in (args.baseline, args.jar_b):
+        if not pathlib.Path(jar).exists(): print_color(f"错误: 找不到 {jar}", Fore.RED); raise SystemExit(1)
+    work_dir = pathlib.Path(tempfile.mkdtemp(prefix="ab_", dir=BASE_DIR))
+    try:
+        pairs, summary = run_ab(pathlib.Path(args.baseline).resolve(), pathlib.Path(args.jar_b).resolve(), args.mode, args.inputs, args.workers, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    print_ab_report(pairs, summary)
+    output_path = pathlib.Path(args.output) if args.output else BASE_DIR / AB_REPORT_FILENAME
+    with open(output_path, "w", encoding='utf-8') as f:
+        json.dump({"jar_a": args.baseline, "jar_b": args.jar_b, "mode": args.mode, "summary": summary, "pairs": pairs},
+                  f, ensure_ascii=False, indent=2, default=str)
+    print(f"报告已写入 {output_path}")
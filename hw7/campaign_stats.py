@@ -0,0 +1,220 @@
+import math
+import json
+from collections import defaultdict, Counter
+
+from perf_bounds import bound_ratios
+from simulator import best_baseline
+from validator import SPECIAL_STAGES, TIMING_CHECKS, SlackHistogram
+
+PERF_METRICS = ["T_run", "WT", "W", "Arrives", "Opens", "Closes"]
+UTILISATION_SUMMARY_METRICS = ["empty_move_ratio", "load_factor", "idle_ratio", "move_share_max"]
+ELEVATOR_METRICS = ["moves", "empty_move_ratio", "avg_load_moving", "load_factor", "opens", "deliveries", "idle_ratio", "energy"] # 按电梯汇总 (指标名 E<id>.<key>)
+TRACKED_QUANTILES = (0.5, 0.9, 0.99)
+# 双侧 95% t 分布临界值 (自由度 1-30), 更大自由度取正态近似 1.96
+T_CRITICAL_95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228, 2.201, 2.179, 2.160, 2.145, 2.131,
+                 2.120, 2.110, 2.101, 2.093, 2.086, 2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+def t_critical_95(df):
+    if df < 1: return float('nan')
+    return T_CRITICAL_95[df - 1] if df <= len(T_CRITICAL_95) else 1.96
+
+def baseline_ratios(perf, baselines):
+    """本程序指标与各基线策略最优值之比 (T_run/WT/W, 不计有乘客未送达的策略), 无基线时为空"""
+    ratios = {}
+    if not perf or not baselines: return ratios
+    for metric in ("T_run", "WT", "W"):
+        best, _ = best_baseline(baselines, metric)
+        if best and metric in perf: ratios[metric] = perf[metric] / best
+    return ratios
+
+class P2Quantile:
+    """P² 算法 (Jain & Chlamtac) 的流式分位数估计, 只保存 5 个标记"""
+    def __init__(self, p):
+        self.p = p; self.initial = []
+        self.heights = []; self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]; self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        if len(self.initial) < 5:
+            self.initial.append(x)
+            if len(self.initial) == 5: self.heights = sorted(self.initial)
+            return
+        q = self.heights; n = self.positions
+        if x < q[0]: q[0] = x; k = 0
+        elif x >= q[4]: q[4] = x; k = 3
+        else: k = next(i for i in range(4) if q[i] <= x < q[i + 1])
+        for i in range(k + 1, 5): n[i] += 1
+        for i in range(5): self.desired[i] += self.increments[i]
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                qp = q[i] + d / (n[i + 1] - n[i - 1]) * ((n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                                                         (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not (q[i - 1] < qp < q[i + 1]): qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = qp; n[i] += d
+
+    def value(self):
+        if len(self.initial) < 5:
+            if not self.initial: return float('nan')
+            ordered = sorted(self.initial)
+            return ordered[min(len(ordered) - 1, int(round(self.p * (len(ordered) - 1))))]
+        return self.heights[2]
+
+class RunningStat:
+    """单个指标的流式统计: Welford 均值/方差, 最小/最大值, P² 分位数"""
+    def __init__(self):
+        self.n = 0; self.mean = 0.0; self.m2 = 0.0
+        self.min = float('inf'); self.max = float('-inf')
+        self.quantiles = {q: P2Quantile(q) for q in TRACKED_QUANTILES}
+
+    def add(self, x):
+        if x is None or not math.isfinite(x): return
+        self.n += 1; delta = x - self.mean; self.mean += delta / self.n; self.m2 += delta * (x - self.mean)
+        self.min = min(self.min, x); self.max = max(self.max, x)
+        for est in self.quantiles.values(): est.add(x)
+
+    @property
+    def stdev(self):
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    @property
+    def ci95(self):
+        """均值的 95% 置信区间半宽"""
+        return t_critical_95(self.n - 1) * self.stdev / math.sqrt(self.n) if self.n > 1 else float('nan')
+
+    def to_dict(self):
+        if self.n == 0: return {"n": 0}
+        d = {"n": self.n, "mean": self.mean, "stdev": self.stdev, "ci95": self.ci95 if self.n > 1 else None, "min": self.min, "max": self.max}
+        for q, est in self.quantiles.items(): d[f"p{int(round(q * 100))}"] = est.value()
+        return d
+
+class CampaignStats:
+    """按模式 (public/mutual) 汇总测试结果的性能指标, 内存占用与测试数无关"""
+    def __init__(self, metrics=PERF_METRICS):
+        self.metrics = list(metrics)
+        self.stats = defaultdict(lambda: defaultdict(RunningStat)); self.status_counts = defaultdict(Counter)
+        self.timing = defaultdict(lambda: {check: SlackHistogram() for check in TIMING_CHECKS})
+
+    def add_value(self, mode, metric, value):
+        if metric not in self.metrics: self.metrics.append(metric)
+        self.stats[mode][metric].add(value)
+
+    def add_result(self, result):
+        mode = result.get("type", "?"); self.status_counts[mode][result.get("status", "UNKNOWN")] += 1
+        contention = result.get("contention")
+        if contention: self.add_value(mode, "loadavg_1m", contention.get("loadavg_1m"))
+        perf = result.get("performance")
+        if result.get("status") != "PASS" or not perf: return
+        for metric in PERF_METRICS:
+            if metric in perf: self.add_value(mode, metric, perf[metric])
+        for metric, ratio in baseline_ratios(perf, result.get("baseline")).items(): self.add_value(mode, f"{metric}/base", ratio)
+        for metric, ratio in bound_ratios(perf, result.get("bounds")).items(): self.add_value(mode, f"{metric}/lb", ratio)
+        utilisation = result.get("utilisation")
+        if utilisation:
+            for metric in UTILISATION_SUMMARY_METRICS: self.add_value(mode, metric, utilisation["summary"].get(metric))
+            for eid, values in utilisation["elevators"].items():
+                for key in ELEVATOR_METRICS: self.add_value(mode, f"E{eid}.{key}", values.get(key))
+        output_lag = result.get("output_lag")
+        if output_lag:
+            for key in ("p50", "p99", "max"): self.add_value(mode, f"lag_{key}", output_lag.get(key))
+        for check, d in (result.get("timing") or {}).items():
+            if check in TIMING_CHECKS: self.timing[mode][check].merge(d)
+        for record in result.get("special") or []:
+            for stage in SPECIAL_STAGES: self.add_value(mode, f"{record['kind']}.{stage}", record.get(stage))
+        latency = result.get("latency")
+        if latency:
+            self.add_value(mode, "starved", latency["starved"]); self.add_value(mode, "transfers", latency["transfers"])
+            for band, wait, ride, total in latency["samples"]:
+                self.add_value(mode, f"P{band}.wait", wait); self.add_value(mode, f"P{band}.ride", ride); self.add_value(mode, f"P{band}.total", total)
+
+    def to_dict(self):
+        return {mode: {"status_counts": dict(self.status_counts[mode]),
+                       "metrics": {m: self.stats[mode][m].to_dict() for m in self.metrics if m in self.stats[mode]},
+                       "timing_slack": {check: hist.to_dict() for check, hist in self.timing[mode].items()} if mode in self.timing else {}}
+                for mode in sorted(set(self.stats) | set(self.status_counts))}
+
+    def live_line(self, mode):
+        """一行实时摘要: 通过率与主要指标的均值±CI"""
+        counts = self.status_counts[mode]; total = sum(counts.values())
+        parts = [f"[{mode}] 通过 {counts.get('PASS', 0)}/{total}"]
+        for metric in ("T_run", "WT", "W"):
+            st = self.stats[mode].get(metric)
+            if st is not None and st.n:
+                ci = f"±{st.ci95:.2f}" if st.n > 1 else ""
+                parts.append(f"{metric} {st.mean:.2f}{ci} (p90 {st.quantiles[0.9].value():.2f})")
+        return " | ".join(parts)
+
+    def format_table(self):
+        lines = []
+        for mode, data in self.to_dict().items():
+            counts = data["status_counts"]; total = sum(counts.values())
+            lines.append(f"[{mode}] 测试 {total}, 通过 {counts.get('PASS', 0)}" + (f" ({counts.get('PASS', 0) / total:.1%})" if total else ""))
+            lines.append(f"  {'指标':<16}{'n':>6}{'mean':>10}{'±95%CI':>9}{'stdev':>9}{'min':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+            for metric, d in data["metrics"].items():
+                if not d.get("n") or "." in metric: continue
+                ci = f"{d['ci95']:.3f}" if d['n'] > 1 else "-"
+                lines.append(f"  {metric:<18}{d['n']:>6}{d['mean']:>10.3f}{ci:>9}{d['stdev']:>9.3f}{d['min']:>9.3f}"
+                             f"{d['p50']:>9.3f}{d['p90']:>9.3f}{d['p99']:>9.3f}{d['max']:>9.3f}")
+        return lines
+
+    def format_elevator_table(self):
+        """各电梯利用率指标的平均值 (行: 电梯, 列: 指标)"""
+        lines = []
+        for mode in sorted(self.stats):
+            eids = sorted({m.split(".")[0] for m in self.stats[mode] if m.startswith("E") and "." in m}, key=lambda e: int(e[1:]))
+            if not eids: continue
+            lines.append(f"[{mode}] 电梯利用率 (通过测试的平均值)")
+            lines.append("  " + f"{'电梯':<6}" + "".join(f"{key:>17}" for key in ELEVATOR_METRICS))
+            for eid in eids:
+                row = [self.stats[mode].get(f"{eid}.{key}") for key in ELEVATOR_METRICS]
+                lines.append("  " + f"{eid:<6}" + "".join(f"{st.mean:>17.3f}" if st is not None and st.n else f"{'-':>17}" for st in row))
+        return lines
+
+    def format_latency_table(self):
+        """按优先级段的乘客延迟 (所有通过测试的乘客合并, 流式分位数)"""
+        lines = []
+        for mode in sorted(self.stats):
+            bands = [m[:-len(".total")] for m in self.stats[mode] if m.startswith("P") and m.endswith(".total")]
+            if not bands: continue
+            lines.append(f"[{mode}] 乘客延迟 (秒, 按优先级段)")
+            lines.append(f"  {'优先级':<10}{'n':>8}{'等待均值':>10}{'等待p90':>10}{'乘坐均值':>10}{'总均值':>10}{'总p90':>10}{'总p99':>10}{'总max':>10}")
+            for band in sorted(bands, key=lambda b: int(b[1:].split("-")[0])):
+                wait = self.stats[mode][f"{band}.wait"]; ride = self.stats[mode][f"{band}.ride"]; total = self.stats[mode][f"{band}.total"]
+                lines.append(f"  {band[1:]:<10}{total.n:>8}{wait.mean:>10.3f}{wait.quantiles[0.9].value():>10.3f}{ride.mean:>10.3f}"
+                             f"{total.mean:>10.3f}{total.quantiles[0.9].value():>10.3f}{total.quantiles[0.99].value():>10.3f}{total.max:>10.3f}")
+        return lines
+
+    def format_special_table(self):
+        """SCHE/UPDATE 各阶段耗时 (秒) 与距 6s 上限的余量"""
+        lines = []
+        for mode in sorted(self.stats):
+            kinds = [k for k in ("SCHE", "UPDATE") if f"{k}.response" in self.stats[mode]]
+            if not kinds: continue
+            lines.append(f"[{mode}] SCHE/UPDATE 阶段耗时 (秒)")
+            lines.append(f"  {'类型':<8}{'阶段':<12}{'n':>6}{'mean':>9}{'min':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+            for kind in kinds:
+                for stage in SPECIAL_STAGES:
+                    st = self.stats[mode].get(f"{kind}.{stage}")
+                    if st is None or not st.n: continue
+                    lines.append(f"  {kind:<8}{stage:<12}{st.n:>6}{st.mean:>9.3f}{st.min:>9.3f}{st.quantiles[0.5].value():>9.3f}"
+                                 f"{st.quantiles[0.9].value():>9.3f}{st.quantiles[0.99].value():>9.3f}{st.max:>9.3f}")
+        return lines
+
+    def format_timing_table(self):
+        """各时间约束的余量直方图 (秒; <0 表示仅靠判定容差通过)"""
+        lines = []
+        for mode in sorted(self.timing):
+            hists = self.timing[mode]
+            if not any(h.n for h in hists.values()): continue
+            labels = SlackHistogram.labels()
+            lines.append(f"[{mode}] 时间余量分布 (实际耗时 - 最小允许耗时, 秒)")
+            lines.append(f"  {'约束':<12}{'n':>8}{'min(ms)':>9}" + "".join(f"{label:>8}" for label in labels))
+            for check, h in hists.items():
+                if not h.n: continue
+                lines.append(f"  {check:<12}{h.n:>8}{h.min * 1000:>+9.1f}" + "".join(f"{c / h.n:>8.1%}" for c in h.counts))
+        return lines
+
+    def save_json(self, path):
+        with open(path, "w", encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
@@ -0,0 +1,166 @@
+import re
+import random
+import shutil
+import sqlite3
+import pathlib
+import argparse
+import datetime
+
+from results_db import file_sha256
+
+CORPUS_DIRNAME = "corpus_hw7" # 位于 BASE_DIR, 不随结果目录清理
+INDEX_FILENAME = "index.sqlite"
+HOMEWORK = "hw7"
+GENERATOR_PROFILE = "phased_hw7" # generate_requests_phased_hw7 生成的输入; 手工添加的输入默认为 manual
+REQUEST_LINE_RE = re.compile(r"^\[\s*(\d+\.\d+)\s*\](.*)$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS inputs (
+    sha256 TEXT PRIMARY KEY,
+    homework TEXT NOT NULL, mode TEXT, profile TEXT, seed INTEGER,
+    passenger_reqs INTEGER, sche_reqs INTEGER, update_reqs INTEGER, requests INTEGER, last_time REAL,
+    size INTEGER, source TEXT, added_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tags (
+    sha256 TEXT NOT NULL REFERENCES inputs(sha256), tag TEXT NOT NULL,
+    PRIMARY KEY (sha256, tag)
+);
+CREATE INDEX IF NOT EXISTS idx_inputs_mode ON inputs(homework, mode);
+CREATE INDEX IF NOT EXISTS idx_inputs_counts ON inputs(update_reqs, sche_reqs);
+CREATE INDEX IF NOT EXISTS idx_tags_tag ON tags(tag);
+"""
+
+def corpus_path(root, sha256):
+    """内容寻址的存储位置: <root>/<哈希前两位>/<哈希>.txt"""
+    return pathlib.Path(root) / sha256[:2] / f"{sha256}.txt"
+
+def describe_input(path):
+    """从输入内容统计各类请求数与最后请求时间 (不依赖生成配置, 手写输入同样适用)"""
+    counts = {"passenger_reqs": 0, "sche_reqs": 0, "update_reqs": 0, "requests": 0, "last_time": 0.0}
+    with open(path, "r", encoding='utf-8', errors='replace') as f:
+        for line in f:
+            m = REQUEST_LINE_RE.match(line.strip())
+            if not m: continue
+            body = m.group(2); counts["requests"] += 1; counts["last_time"] = max(counts["last_time"], float(m.group(1)))
+            if body.startswith("SCHE-"): counts["sche_reqs"] += 1
+            elif body.startswith("UPDATE-"): counts["update_reqs"] += 1
+            elif "-FROM-" in body: counts["passenger_reqs"] += 1
+    return counts
+
+class InputCorpus:
+    """按内容哈希去重保存的输入语料库, SQLite 索引记录作业/模式/生成配置/种子/请求数与标签"""
+    def __init__(self, root):
+        self.root = pathlib.Path(root); self.root.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.root / INDEX_FILENAME))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def add(self, path, mode=None, seed=None, profile="manual", tags=(), source=None):
+        """保存输入 (内容已存在时只补充标签), 返回内容哈希"""
+        sha = file_sha256(path); target = corpus_path(self.root, sha)
+        if not target.exists():
+            target.parent.mkdir(exist_ok=True); shutil.copy2(path, target)
+        counts = describe_input(target)
+        self.conn.execute(
+            "INSERT OR IGNORE INTO inputs (sha256, homework, mode, profile, seed, passenger_reqs, sche_reqs, update_reqs, requests, last_time, "
+            "size, source, added_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (sha, HOMEWORK, mode, profile, seed, counts["passenger_reqs"], counts["sche_reqs"], counts["update_reqs"], counts["requests"],
+             counts["last_time"], target.stat().st_size, str(source or path), datetime.datetime.now().isoformat(timespec='seconds')))
+        self.add_tags(sha, tags, commit=False)
+        self.conn.commit()
+        return sha
+
+    def add_tags(self, sha, tags, commit=True):
+        self.conn.executemany("INSERT OR IGNORE INTO tags (sha256, tag) VALUES (?, ?)", [(sha, tag) for tag in tags if tag])
+        if commit: self.conn.commit()
+
+    def remove_tags(self, sha, tags):
+        self.conn.executemany("DELETE FROM tags WHERE sha256 = ? AND tag = ?", [(sha, tag) for tag in tags])
+        self.conn.commit()
+
+    def resolve(self, prefix):
+        """哈希前缀 -> 完整哈希 (不唯一或不存在时为 None)"""
+        rows = self.conn.execute("SELECT sha256 FROM inputs WHERE sha256 LIKE ? LIMIT 2", (prefix + "%",)).fetchall()
+        return rows[0]["sha256"] if len(rows) == 1 else None
+
+    def path_for(self, sha):
+        return corpus_path(self.root, sha)
+
+    def tags_of(self, sha):
+        return [row["tag"] for row in self.conn.execute("SELECT tag FROM tags WHERE sha256 = ? ORDER BY tag", (sha,))]
+
+    def select(self, mode=None, homework=HOMEWORK, profile=None, seed=None, passenger_reqs=None, sche_reqs=None, update_reqs=None,
+               min_passengers=None, max_passengers=None, tags=(), exclude_tags=(), limit=None, shuffle=False):
+        """按条件选取输入, tags 需全部具备, exclude_tags 均不具备; shuffle 时随机抽取 limit 个"""
+        conditions = ["i.homework = ?"]; params = [homework]
+        for column, value in (("mode", mode), ("profile", profile), ("seed", seed), ("passenger_reqs", passenger_reqs),
+                              ("sche_reqs", sche_reqs), ("update_reqs", update_reqs)):
+            if value is not None: conditions.append(f"i.{column} = ?"); params.append(value)
+        if min_passengers is not None: conditions.append("i.passenger_reqs >= ?"); params.append(min_passengers)
+        if max_passengers is not None: conditions.append("i.passenger_reqs <= ?"); params.append(max_passengers)
+        for tag in tags: conditions.append("EXISTS (SELECT 1 FROM tags t WHERE t.sha256 = i.sha256 AND t.tag = ?)"); params.append(tag)
+        for tag in exclude_tags: conditions.append("NOT EXISTS (SELECT 1 FROM tags t WHERE t.sha256 = i.sha256 AND t.tag = ?)"); params.append(tag)
+        rows = self.conn.execute(f"SELECT i.* FROM inputs i WHERE {' AND '.join(conditions)} ORDER BY i.added_at, i.sha256", tuple(params)).fetchall()
+        if shuffle: rows = random.sample(rows, len(rows))
+        return rows[:limit] if limit else rows
+
+    def stats(self):
+        """按作业/模式/SCHE 数/UPDATE 数分组的输入数量"""
+        return self.conn.execute("SELECT homework, mode, sche_reqs, update_reqs, COUNT(*) AS count, AVG(passenger_reqs) AS passengers "
+                                 "FROM inputs GROUP BY homework, mode, sche_reqs, update_reqs ORDER BY homework, mode, sche_reqs, update_reqs").fetchall()
+
+    def close(self):
+        self.conn.close()
+
+def config_from_row(row):
+    """语料库记录 -> run_test 的测试配置 (corpus_sha 指向语料库中的输入)"""
+    return {'type': row['mode'], 'seed': row['seed'], 'passenger_reqs': row['passenger_reqs'], 'sche_reqs': row['sche_reqs'],
+            'update_reqs': row['update_reqs'], 'corpus_sha': row['sha256']}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HW7 输入语料库")
+    parser.add_argument("--root", default=str(pathlib.Path(__file__).parent.resolve() / CORPUS_DIRNAME), help="语料库目录")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_add = sub.add_parser("add", help="添加输入文件"); p_add.add_argument("files", nargs="+")
+    p_add.add_argument("--mode", choices=["public", "mutual"]); p_add.add_argument("--tag", action="append", default=[])
+    p_list = sub.add_parser("list", help="按条件列出输入")
+    p_list.add_argument("--mode", choices=["public", "mutual"]); p_list.add_argument("--profile"); p_list.add_argument("--seed", type=int)
+    p_list.add_argument("--sche", type=int); p_list.add_argument("--update", type=int)
+    p_list.add_argument("--min-passengers", type=int); p_list.add_argument("--max-passengers", type=int)
+    p_list.add_argument("--tag", action="append", default=[]); p_list.add_argument("--exclude-tag", action="append", default=[])
+    p_list.add_argument("--limit", type=int); p_list.add_argument("--export", help="把选中的输入复制到该目录")
+    p_tag = sub.add_parser("tag", help="增删标签"); p_tag.add_argument("sha", help="哈希前缀")
+    p_tag.add_argument("--add", action="append", default=[]); p_tag.add_argument("--remove", action="append", default=[])
+    sub.add_parser("stats", help="按模式与 SCHE/UPDATE 数统计")
+    args = parser.parse_args()
+
+    corpus = InputCorpus(args.root)
+    try:
+        if args.command == "add":
+            for file in args.files:
+                sha = corpus.add(file, mode=args.mode, tags=args.tag); print(f"{sha[:12]}  {file}")
+        elif args.command == "list":
+            rows = corpus.select(args.mode, profile=args.profile, seed=args.seed, sche_reqs=args.sche, update_reqs=args.update,
+                                 min_passengers=args.min_passengers, max_passengers=args.max_passengers,
+                                 tags=args.tag, exclude_tags=args.exclude_tag, limit=args.limit)
+            print(f"{'sha256':<14}{'模式':<8}{'P':>5}{'S':>4}{'U':>4}{'末请求':>8}{'seed':>12}  标签")
+            for row in rows:
+                seed = row['seed'] if row['seed'] is not None else '-'
+                print(f"{row['sha256'][:12]:<14}{row['mode'] or '-':<8}{row['passenger_reqs']:>5}{row['sche_reqs']:>4}{row['update_reqs']:>4}"
+                      f"{row['last_time']:>8.1f}{seed:>12}  {','.join(corpus.tags_of(row['sha256']))}")
+            print(f"共 {len(rows)} 个输入")
+            if args.export:
+                export_dir = pathlib.Path(args.export); export_dir.mkdir(parents=True, exist_ok=True)
+                for row in rows: shutil.copy2(corpus.path_for(row['sha256']), export_dir / f"{row['sha256'][:12]}.txt")
+                print(f"已导出到 {export_dir}")
+        elif args.command == "tag":
+            sha = corpus.resolve(args.sha)
+            if sha is None: print(f"找不到唯一匹配 {args.sha} 的输入"); raise SystemExit(1)
+            corpus.add_tags(sha, args.add); corpus.remove_tags(sha, args.remove)
+            print(f"{sha[:12]}: {','.join(corpus.tags_of(sha))}")
+        elif args.command == "stats":
+            print(f"{'作业':<6}{'模式':<8}{'SCHE':>6}{'UPDATE':>8}{'输入数':>8}{'平均乘客数':>12}")
+            for row in corpus.stats():
+                print(f"{row['homework']:<6}{row['mode'] or '-':<8}{row['sche_reqs']:>6}{row['update_reqs']:>8}{row['count']:>8}{row['passengers']:>12.1f}")
+    finally:
+        corpus.close()
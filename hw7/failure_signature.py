@@ -0,0 +1,96 @@
+import re
+import json
+import pathlib
+from collections import OrderedDict
+
+EVENT_TYPES = ["SCHE-ACCEPT", "SCHE-BEGIN", "SCHE-END", "UPDATE-ACCEPT", "UPDATE-BEGIN", "UPDATE-END",
+               "OUT-S", "OUT-F", "RECEIVE", "ARRIVE", "OPEN", "CLOSE", "IN", "OUT", "SCHE", "UPDATE"]
+EVENT_TYPE_RE = re.compile(r"(?<![A-Z-])(" + "|".join(re.escape(e) for e in EVENT_TYPES) + r")(?![A-Z])")
+
+# (关键字, 错误类别), 按顺序匹配第一个
+ERROR_KINDS = [
+    ("看门狗", "deadlock"), ("内部错误", "validator-internal"), ("验证崩溃", "validator-internal"),
+    ("Unrecognized", "format"), ("Invalid", "format"), ("missing", "format"), ("Timestamp non-decreasing", "timestamp-order"),
+    ("碰撞", "collision"), ("超载", "overload"), ("空载", "empty-move"), ("过早", "timing-early"),
+    ("过短", "timing-short"), ("超时", "response-timeout"), ("过长", "response-timeout"), ("ARRIVE 次数", "arrive-count"),
+    ("ACTIVE 状态", "state-violation"), ("UPDATING 状态", "state-violation"), ("非 ", "state-violation"), ("门未关", "door-state"), ("门未开", "door-state"), ("时门开", "door-state"),
+    ("无效移动", "invalid-move"), ("超出范围", "invalid-move"), ("错误楼层", "wrong-floor"), ("等待在", "wrong-floor"), ("无法将其送达", "unreachable"),
+    ("未被其接收", "receive"), ("已被", "receive"), ("RECEIVE", "receive"), ("未到达", "unfinished"),
+    ("结束时", "final-state"), ("非目的地", "wrong-destination"), ("应为 OUT-S", "wrong-destination"),
+]
+ELEVATOR_STATES = [("UPDATE ACTIVE", "U_ACTV"), ("U_ACTV", "U_ACTV"), ("U_PEND", "U_PEND"), ("SCHE ACTIVE", "S_ACTV"),
+                   ("S_ACTV", "S_ACTV"), ("S_PEND", "S_PEND"), ("UPDATING", "UPDATING"), ("双轿厢", "DOUBLE_CAR"), ("IDLE", "IDLE")]
+
+STATUS_KINDS = {"FAIL_TIMEOUT": "timeout", "FAIL_DEADLOCK": "deadlock", "FAIL_STDERR_OUTPUT": "stderr",
+                "FAIL_JAVA_ERROR": "java-exit", "FAIL_RESOURCE_LIMIT": "resource-limit", "FAIL_RUNTIME": "runner", "FAIL_WRAPPER_ERROR": "runner", "FAIL_FUTURE_ERROR": "runner"}
+
+def normalize_error(message):
+    """抽象掉错误信息中的 ID、时间、楼层和数字, 得到错误模板"""
+    msg = message.split("\n")[0]
+    msg = re.sub(r"^Validation Error:\s*", "", msg)
+    msg = re.sub(r"\s*\(at time ~[^)]*\)", "", msg)
+    msg = re.sub(r"\(line: '[^']*'\)", "(line: ...)", msg)
+    msg = re.sub(r"<0x[0-9a-fA-F]+>", "<addr>", msg)
+    msg = re.sub(r"\b[PE]\d+\b", lambda m: m.group(0)[0] + "#", msg)
+    msg = re.sub(r"(?<![A-Za-z])[BF]\d+\b", "<FL>", msg)
+    msg = re.sub(r"\[[^\]]*<FL>[^\]]*\]", "[<FL>-<FL>]", msg)
+    msg = re.sub(r"-?\d+(\.\d+)?", "#", msg)
+    return re.sub(r"\s+", " ", msg).strip()
+
+def error_kind(message):
+    for keyword, kind in ERROR_KINDS:
+        if keyword in message: return kind
+    return "other"
+
+def event_type(message):
+    m = EVENT_TYPE_RE.search(message.replace("Validation Error:", ""))
+    return m.group(1) if m else "-"
+
+def elevator_state(message):
+    for keyword, state in ELEVATOR_STATES:
+        if keyword in message: return state
+    return "-"
+
+def signature_parts(result):
+    """返回失败签名各组成部分 (status, kind, event, state, template); PASS 返回 None"""
+    status = result.get("status", "FAIL_UNKNOWN")
+    if status == "PASS": return None
+    errors = [e for e in (result.get("errors") or []) if e and not e.startswith("---")]
+    first_error = errors[0] if errors else ""
+    kind = STATUS_KINDS.get(status) or (error_kind(first_error) if first_error else "unknown")
+    if any("锁环" in line for line in result.get("thread_dump_summary") or []): kind += "+lock-cycle"
+    return OrderedDict([("status", status), ("kind", kind), ("event", event_type(first_error)),
+                        ("state", elevator_state(first_error)), ("template", normalize_error(first_error) if first_error else "")])
+
+def failure_signature(result):
+    """失败签名字符串 (用于聚类、最小化与复现判定). PASS 返回 None"""
+    parts = signature_parts(result)
+    return None if parts is None else "|".join(parts.values())
+
+def _input_size(path):
+    try:
+        with open(path, "r", encoding='utf-8') as f: return sum(1 for line in f if line.strip())
+    except OSError:
+        return float('inf')
+
+def cluster_failures(failures, inputs_dir):
+    """按签名聚类失败结果, 返回按数量降序的 [{'signature', 'parts', 'count', 'indices', 'representative', 'representative_size'}]"""
+    inputs_dir = pathlib.Path(inputs_dir); clusters = {}
+    for failure in failures:
+        parts = signature_parts(failure)
+        if parts is None: continue
+        sig = "|".join(parts.values())
+        cluster = clusters.setdefault(sig, {"signature": sig, "parts": dict(parts), "count": 0, "indices": [],
+                                            "representative": None, "representative_size": float('inf')})
+        cluster["count"] += 1; cluster["indices"].append(failure.get("index"))
+        input_path = inputs_dir / f"failed_data_{failure.get('index')}_{failure.get('type')}.txt"
+        size = _input_size(input_path)
+        if size < cluster["representative_size"]:
+            cluster["representative"] = input_path.name; cluster["representative_size"] = size
+    for cluster in clusters.values():
+        if cluster["representative_size"] == float('inf'): cluster["representative_size"] = None
+    return sorted(clusters.values(), key=lambda c: (-c["count"], c["signature"]))
+
+def save_clusters(clusters, path):
+    with open(path, "w", encoding='utf-8') as f:
+        json.dump(clusters, f, ensure_ascii=False, indent=2, default=str)
@@ -0,0 +1,115 @@
+import json
+import time
+import pathlib
+import argparse
+from collections import Counter
+
+from run_test import run_tests_parallel, print_color, Fore, Style, JAR_FILE, MAX_WORKERS
+from failure_signature import failure_signature
+
+FLAKY_RERUN_COUNT = 5 # 高负载下 (与其他重跑并行) 每个失败输入的重跑次数
+FLAKY_ISOLATED_COUNT = 2 # 单独 (串行) 重跑次数, 用于区分负载敏感
+FLAKY_ISOLATED_BUDGET_SECONDS = 600 # 单独重跑阶段的总时间上限, 超出后不再开始新的单独重跑
+FLAKY_REPORT_FILENAME = "flaky_report.json"
+
+LABEL_DETERMINISTIC = "deterministic"; LABEL_FLAKY = "flaky"
+LABEL_LOAD_SENSITIVE = "load-sensitive"; LABEL_NOT_REPRODUCED = "not-reproduced"
+LABEL_TEXT = {LABEL_DETERMINISTIC: "必现", LABEL_FLAKY: "偶发", LABEL_LOAD_SENSITIVE: "负载敏感", LABEL_NOT_REPRODUCED: "未复现"}
+
+def classify(concurrent_sigs, isolated_sigs):
+    """根据并发/单独重跑的失败签名 (None 表示通过) 给出标签"""
+    concurrent_fails = sum(1 for s in concurrent_sigs if s); isolated_fails = sum(1 for s in isolated_sigs if s)
+    if concurrent_fails == 0 and isolated_fails == 0: return LABEL_NOT_REPRODUCED
+    if concurrent_fails == len(concurrent_sigs) and isolated_fails == len(isolated_sigs): return LABEL_DETERMINISTIC
+    if concurrent_fails > 0 and isolated_fails == 0 and isolated_sigs: return LABEL_LOAD_SENSITIVE
+    return LABEL_FLAKY
+
+def rerun_failures(failures, inputs_dir, rerun_count=FLAKY_RERUN_COUNT, isolated_count=FLAKY_ISOLATED_COUNT,
+                   workers=MAX_WORKERS, jar_file=JAR_FILE, isolated_budget=FLAKY_ISOLATED_BUDGET_SECONDS):
+    """对每个失败结果的输入 (inputs_dir/failed_data_<idx>_<type>.txt) 并发重跑 rerun_count 次, 再单独重跑 isolated_count 次.
+    单独重跑按轮次 (每轮每个输入一次) 逐个进行, 累计超过 isolated_budget 秒后停止; 只计入完整的轮次, 各输入的单独重跑次数相同. 返回 {index: 报告}"""
+    inputs_dir = pathlib.Path(inputs_dir); targets = []
+    for failure in failures:
+        idx = failure.get("index"); ftype = failure.get("type")
+        input_path = inputs_dir / f"failed_data_{idx}_{ftype}.txt"
+        if input_path.exists(): targets.append((failure, input_path))
+    if not targets: return {}
+
+    def make_jobs(tag, count):
+        jobs = []
+        for rep in range(count): # 按轮次交错提交, 让同一输入的重跑分布在不同负载时刻
+            for failure, input_path in targets:
+                config = {'type': failure["type"], 'stdin_file': str(input_path), 'jar_file': str(jar_file), 'save_artifacts': False}
+                jobs.append((f"{tag}{failure['index']}_{rep}", config))
+        return jobs
+
+    print_color(f"\n--- 偶发性分析: {len(targets)} 个失败输入, 每个并发重跑 {rerun_count} 次 ---", Style.BRIGHT)
+    concurrent_jobs = make_jobs("flaky", rerun_count)
+    concurrent_results = run_tests_parallel(concurrent_jobs, inputs_dir, max_workers=workers) if concurrent_jobs else []
+    isolated_results = []
+    if isolated_count > 0:
+        print_color(f"--- 偶发性分析: 每个输入单独重跑 {isolated_count} 次 (总时长上限 {isolated_budget:.0f}s) ---", Style.BRIGHT)
+        isolated_start = time.monotonic()
+        for job in make_jobs("isolated", isolated_count):
+            if time.monotonic() - isolated_start > isolated_budget:
+                print_color(f"  单独重跑超过 {isolated_budget:.0f}s, 剩余 {len(targets) * isolated_count - len(isolated_results)} 次跳过", Fore.YELLOW); break
+            isolated_results.extend(run_tests_parallel([job], inputs_dir, max_workers=1))
+        complete_rounds = len(isolated_results) // len(targets)
+        if complete_rounds < isolated_count: print_color(f"  单独重跑只计入完整的 {complete_rounds} 轮", Fore.YELLOW)
+        isolated_results = isolated_results[:complete_rounds * len(targets)]
+
+    reports = {}
+    for ti, (failure, input_path) in enumerate(targets):
+        concurrent_sigs = [failure_signature(concurrent_results[rep * len(targets) + ti]) for rep in range(rerun_count)]
+        isolated_sigs = [failure_signature(isolated_results[pos]) for pos in range(ti, len(isolated_results), len(targets))]
+        original_sig = failure_signature(failure) if failure.get("status") else None # CLI 模式下原始失败未知
+        all_sigs = ([original_sig] if original_sig else []) + concurrent_sigs + isolated_sigs
+        failing = [s for s in all_sigs if s]
+        reports[failure["index"]] = {
+            "type": failure["type"], "input": str(input_path), "label": classify(concurrent_sigs, isolated_sigs),
+            "original_signature": original_sig,
+            "concurrent_fail_rate": sum(1 for s in concurrent_sigs if s) / len(concurrent_sigs) if concurrent_sigs else 0.0,
+            "isolated_fail_rate": sum(1 for s in isolated_sigs if s) / len(isolated_sigs) if isolated_sigs else 0.0,
+            "reproduction_rate": len(failing) / len(all_sigs) if all_sigs else 0.0,
+            "same_signature_rate": sum(1 for s in all_sigs if s == original_sig) / len(all_sigs) if original_sig else None,
+            "signatures": dict(Counter(failing)),
+            "concurrent_runs": concurrent_sigs, "isolated_runs": isolated_sigs,
+        }
+    return reports
+
+def print_flaky_report(reports):
+    if not reports: return
+    print("\n--- 偶发性分析结果 ---")
+    label_color = {LABEL_DETERMINISTIC: Fore.RED, LABEL_FLAKY: Fore.YELLOW, LABEL_LOAD_SENSITIVE: Fore.MAGENTA, LABEL_NOT_REPRODUCED: Fore.CYAN}
+    for idx, rep in sorted(reports.items(), key=lambda kv: str(kv[0])):
+        print_color(f"  测试 {idx} ({rep['type']}): {LABEL_TEXT[rep['label']]} - 复现率 {rep['reproduction_rate']:.0%} "
+                    f"(并发 {rep['concurrent_fail_rate']:.0%}, 单独 " + (f"{rep['isolated_fail_rate']:.0%}" if rep['isolated_runs'] else "-")
+                    + (f", 同签名 {rep['same_signature_rate']:.0%})" if rep['same_signature_rate'] is not None else ")"),
+                    label_color.get(rep['label'], Fore.WHITE))
+        if len(rep["signatures"]) > 1:
+            for sig, count in Counter(rep["signatures"]).most_common(3): print(f"      {count}x {sig[:150]}")
+
+def save_flaky_report(reports, results_path):
+    with open(pathlib.Path(results_path) / FLAKY_REPORT_FILENAME, "w", encoding='utf-8') as f:
+        json.dump(reports, f, ensure_ascii=False, indent=2, default=str)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HW7 失败输入偶发性分析 (并行重跑并统计复现率)")
+    parser.add_argument("inputs", nargs="+", help="失败输入文件 (failed_data_<idx>_<type>.txt)")
+    parser.add_argument("--jar", default=str(JAR_FILE), help="被测 jar (默认 code.jar)")
+    parser.add_argument("--reruns", type=int, default=FLAKY_RERUN_COUNT)
+    parser.add_argument("--isolated", type=int, default=FLAKY_ISOLATED_COUNT)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--isolated-budget", type=float, default=FLAKY_ISOLATED_BUDGET_SECONDS, help="单独重跑阶段的总秒数上限")
+    args = parser.parse_args()
+    stubs_by_dir = {}
+    for input_file in args.inputs:
+        input_path = pathlib.Path(input_file).resolve()
+        parts = input_path.stem.split("_")
+        if len(parts) != 4 or parts[:2] != ["failed", "data"] or parts[3] not in ("public", "mutual"):
+            print_color(f"跳过 {input_path}: 文件名需为 failed_data_<idx>_<type>.txt", Fore.YELLOW); continue
+        stubs_by_dir.setdefault(input_path.parent, []).append({"index": parts[2], "type": parts[3], "status": None, "errors": []})
+    all_reports = {}
+    for inputs_dir, stubs in stubs_by_dir.items():
+        all_reports.update(rerun_failures(stubs, inputs_dir, args.reruns, args.isolated, args.workers, args.jar, args.isolated_budget))
+    print_flaky_report(all_reports)
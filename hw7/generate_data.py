@@ -23,7 +23,8 @@ def generate_requests_phased_hw7(
     num_update_requests=2,
     max_time=MAX_TIME_DEFAULT,
     filename="stdin.txt",
-    is_mutual_test=False
+    is_mutual_test=False,
+    rng=random # 传入 random.Random(seed) 时不读写全局随机状态, 可在后台线程中生成
 ):
     if is_mutual_test:
         max_time = MAX_TIME_MUTUAL; num_update_requests = min(num_update_requests, MAX_UPDATE_REQUESTS)
@@ -42,7 +43,7 @@ def generate_requests_phased_hw7(
         num_update_requests = min(num_update_requests, MAX_UPDATE_REQUESTS);
         if num_passenger_requests == 0: num_passenger_requests = 1
 
-    person_ids = random.sample(range(1, 10001 + num_passenger_requests), num_passenger_requests)
+    person_ids = rng.sample(range(1, 10001 + num_passenger_requests), num_passenger_requests)
     person_id_index = 0; sche_request_counts = defaultdict(int); updated_elevators = set()
     last_special_request_time_for_elevator = defaultdict(lambda: 0.0) # 初始化为 0.0
 
@@ -52,12 +53,12 @@ def generate_requests_phased_hw7(
     phase2_start, phase2_end = max_time * 0.15, max_time * 0.50
     phase4_start, phase4_end = max_time * 0.75, max_time
     update_timestamps_targets = []
-    if num_update_requests >= 1: update_timestamps_targets.append(random.uniform(phase2_start, phase2_end))
-    if num_update_requests >= 2: update_timestamps_targets.append(random.uniform(phase4_start, phase4_end))
+    if num_update_requests >= 1: update_timestamps_targets.append(rng.uniform(phase2_start, phase2_end))
+    if num_update_requests >= 2: update_timestamps_targets.append(rng.uniform(phase4_start, phase4_end))
     if num_update_requests >= 3:
-        third_ts = random.uniform(phase4_start, phase4_end)
+        third_ts = rng.uniform(phase4_start, phase4_end)
         if len(update_timestamps_targets) > 1 and abs(third_ts - update_timestamps_targets[1]) < 1.0 :
-            third_ts = random.uniform(phase4_start, phase4_end)
+            third_ts = rng.uniform(phase4_start, phase4_end)
         update_timestamps_targets.append(third_ts)
 
     update_timestamps_targets.sort()
@@ -70,10 +71,10 @@ def generate_requests_phased_hw7(
 
         found_pair = False
         for _ in range(ELEVATOR_COUNT * 2):
-            e_a, e_b = random.sample(available_elevators, 2)
+            e_a, e_b = rng.sample(available_elevators, 2)
             if ts_update >= last_special_request_time_for_elevator[e_a] + MIN_SPECIAL_INTERVAL and \
                ts_update >= last_special_request_time_for_elevator[e_b] + MIN_SPECIAL_INTERVAL:
-                 target_floor = random.choice(UPDATE_TARGET_FLOORS)
+                 target_floor = rng.choice(UPDATE_TARGET_FLOORS)
                  request_str = f"[{ts_update:.1f}]UPDATE-{e_a}-{e_b}-{floor_to_str(target_floor)}" # 使用 .1f 格式
                  all_generated_requests.append((ts_update, request_str))
                  update_requests_generated += 1
@@ -84,7 +85,7 @@ def generate_requests_phased_hw7(
                  break # 找到一对就生成
 
     sche_requests_generated = 0
-    sche_timestamps = sorted([random.uniform(1.0, max_time) for _ in range(num_sche_requests * 2)]) # 生成稍多时间戳备用
+    sche_timestamps = sorted([rng.uniform(1.0, max_time) for _ in range(num_sche_requests * 2)]) # 生成稍多时间戳备用
 
     for ts_sche in sche_timestamps:
         if sche_requests_generated >= num_sche_requests: break
@@ -97,26 +98,26 @@ def generate_requests_phased_hw7(
             valid_schedule_elevators.append(eid)
 
         if valid_schedule_elevators:
-            elevator_id = random.choice(valid_schedule_elevators)
-            target_floor = random.choice(SCHE_TARGET_FLOORS); speed = random.choice(SCHE_SPEEDS_CORRECT)
+            elevator_id = rng.choice(valid_schedule_elevators)
+            target_floor = rng.choice(SCHE_TARGET_FLOORS); speed = rng.choice(SCHE_SPEEDS_CORRECT)
             request_str = (f"[{ts_sche:.1f}]SCHE-{elevator_id}-{speed:.1f}-{floor_to_str(target_floor)}")
             all_generated_requests.append((ts_sche, request_str))
             sche_request_counts[elevator_id] += 1; sche_requests_generated += 1
             last_special_request_time_for_elevator[elevator_id] = ts_sche
 
     passenger_reqs_generated = 0
-    passenger_timestamps = sorted([random.uniform(1.0, max_time) for _ in range(num_passenger_requests)])
+    passenger_timestamps = sorted([rng.uniform(1.0, max_time) for _ in range(num_passenger_requests)])
 
     for ts_p in passenger_timestamps:
         if passenger_reqs_generated >= num_passenger_requests: break
         if person_id_index < len(person_ids):
             pid = person_ids[person_id_index]
             from_floor, to_floor, priority = -99, -99, -1
-            from_floor=random.choice(VALID_FLOORS)
+            from_floor=rng.choice(VALID_FLOORS)
             possible_tos = list(set(VALID_FLOORS) - {from_floor})
             if not possible_tos: to_floor = 1 if from_floor != 1 else 2 # Fallback
-            else: to_floor = random.choice(possible_tos)
-            priority = random.randint(1, 100)
+            else: to_floor = rng.choice(possible_tos)
+            priority = rng.randint(1, 100)
 
             request_str = (f"[{ts_p:.1f}]{pid}-PRI-{priority}-FROM-{floor_to_str(from_floor)}-TO-{floor_to_str(to_floor)}")
             all_generated_requests.append((ts_p, request_str))
@@ -179,6 +180,47 @@ def generate_requests_phased_hw7(
         print(f"写入 {filename} 出错: {e}")
         return False
 
+def check_request_constraints(request_lines, is_mutual_test=False):
+    """按生成器的约束检查一组请求行 (时间递增, 乘客 ID 唯一, SCHE/UPDATE 数量与间隔, 已 UPDATE 电梯不再 SCHE 等), 返回违规描述列表"""
+    violations = []; last_time = 0.0; passenger_ids = set(); passenger_count = 0
+    sche_counts = defaultdict(int); updated_elevators = set(); last_special_time = {}
+    update_count = 0; sche_count = 0
+    for line in request_lines:
+        line = line.strip()
+        if not line: continue
+        ts_match = re.match(r"\[\s*(\d+\.\d+)\s*\]", line)
+        if not ts_match: violations.append(f"格式错误: {line}"); continue
+        ts = float(ts_match.group(1)); content = line[ts_match.end():]
+        if ts < last_time: violations.append(f"时间戳递减: {line}")
+        if ts < 1.0: violations.append(f"时间戳早于 1.0: {line}")
+        last_time = max(last_time, ts)
+        m_p = re.fullmatch(r"(\d+)-PRI-(\d+)-FROM-([BF]\d+)-TO-([BF]\d+)", content)
+        m_s = re.fullmatch(r"SCHE-(\d+)-(\d+\.\d+)-([BF]\d+)", content)
+        m_u = re.fullmatch(r"UPDATE-(\d+)-(\d+)-([BF]\d+)", content)
+        if m_p:
+            pid = int(m_p.group(1)); passenger_count += 1
+            if pid in passenger_ids: violations.append(f"乘客 ID 重复: {line}")
+            passenger_ids.add(pid)
+        elif m_s:
+            eid = int(m_s.group(1)); sche_count += 1; sche_counts[eid] += 1
+            if eid in updated_elevators: violations.append(f"SCHE 针对已 UPDATE 的电梯: {line}")
+            if is_mutual_test and sche_counts[eid] > MAX_SCHE_PER_ELEVATOR_MUTUAL: violations.append(f"互测单电梯 SCHE 过多: {line}")
+            if eid in last_special_time and ts < last_special_time[eid] + MIN_SPECIAL_INTERVAL: violations.append(f"SCHE/UPDATE 间隔过短: {line}")
+            last_special_time[eid] = ts
+        elif m_u:
+            e_a, e_b = int(m_u.group(1)), int(m_u.group(2)); update_count += 1
+            if e_a == e_b or e_a in updated_elevators or e_b in updated_elevators: violations.append(f"UPDATE 电梯重复: {line}")
+            for eid in (e_a, e_b):
+                if eid in last_special_time and ts < last_special_time[eid] + MIN_SPECIAL_INTERVAL: violations.append(f"SCHE/UPDATE 间隔过短: {line}")
+                last_special_time[eid] = ts
+            updated_elevators.update((e_a, e_b))
+        else: violations.append(f"无法识别的请求: {line}")
+    if passenger_count == 0: violations.append("没有乘客请求")
+    if update_count > MAX_UPDATE_REQUESTS: violations.append(f"UPDATE 数量 {update_count} > {MAX_UPDATE_REQUESTS}")
+    if is_mutual_test and passenger_count + sche_count + update_count > MAX_TOTAL_REQUESTS_MUTUAL: violations.append(f"互测请求总数超过 {MAX_TOTAL_REQUESTS_MUTUAL}")
+    if not is_mutual_test and sche_count > MAX_SCHE_REQUESTS_PUBLIC: violations.append(f"SCHE 数量 {sche_count} > {MAX_SCHE_REQUESTS_PUBLIC}")
+    return violations
+
 if __name__ == '__main__':
     print("为 HW7 生成数据 (默认互测模式)...")
     pass_req = 60; sche_req = 5; upd_req = 2 # 目标值
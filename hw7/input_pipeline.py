@@ -0,0 +1,71 @@
+import queue
+import pathlib
+import threading
+
+PIPELINE_BUFFER_SIZE = 20 # 已生成但尚未开始运行的输入数上限 (生产者最多领先执行这么多个)
+
+class InputPipeline:
+    """输入生成阶段: 后台线程按顺序为 [(test_index, config)] 生成输入文件到 inputs_dir 并估计耗时, 放入缓冲区
+    (已生成且尚未取出的测试合计不超过 buffer_size 个);
+    执行阶段通过 take() 取出就绪的测试. longest_first 时从缓冲区中取预计耗时最长者 (窗口内最长优先), 否则按生成顺序.
+    generate(config, path) -> bool 生成输入; estimate(config, path) -> 秒 (可选).
+    取出的 config 中加入 stdin_file; 生成失败的测试保留原配置 (由 worker 自行生成并报告失败), 预计耗时记为 None"""
+    def __init__(self, jobs, inputs_dir, generate, estimate=None, longest_first=True, buffer_size=PIPELINE_BUFFER_SIZE, on_error=None):
+        self.jobs = list(jobs); self.inputs_dir = pathlib.Path(inputs_dir)
+        self.generate = generate; self.estimate = estimate; self.longest_first = longest_first; self.on_error = on_error
+        self.buffer_size = max(1, buffer_size); self.queue = queue.Queue()
+        self.slots = threading.Semaphore(self.buffer_size) # 生成前占用一个槽位, take() 取出时归还
+        self.ready = []; self.exhausted = False; self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._produce, daemon=True)
+
+    def start(self):
+        self.inputs_dir.mkdir(parents=True, exist_ok=True); self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _produce(self):
+        try:
+            for test_index, config in self.jobs:
+                while not self.stop_event.is_set() and not self.slots.acquire(timeout=0.5): pass
+                if self.stop_event.is_set(): break
+                config = dict(config); path = self.inputs_dir / f"input_{test_index}_{config['type']}.txt"; estimate = None
+                try:
+                    if self.generate(config, path):
+                        config['stdin_file'] = str(path)
+                        if self.estimate is not None: estimate = self.estimate(config, path)
+                except Exception as e_gen:
+                    config.pop('stdin_file', None)
+                    if self.on_error: self.on_error(test_index, e_gen)
+                self.queue.put((test_index, config, estimate))
+        finally:
+            self.queue.put(None)
+
+    def _pull(self, block):
+        try: item = self.queue.get(block=block)
+        except queue.Empty: return False
+        if item is None: self.exhausted = True; return False
+        self.ready.append(item); return True
+
+    def take(self):
+        """取出下一个要运行的测试 (test_index, config, estimate); 全部取完时返回 None.
+        longest_first 时等待缓冲区填满 (生成远快于运行, 代价很小) 以便在完整窗口内挑选; 否则仅在缓冲区为空时等待生产者"""
+        if self.longest_first:
+            while not self.exhausted and len(self.ready) < self.buffer_size: self._pull(block=True)
+        else:
+            while not self.exhausted and len(self.ready) < self.buffer_size and self._pull(block=False): pass
+            if not self.ready and not self.exhausted: self._pull(block=True)
+        if not self.ready: return None
+        self.slots.release()
+        if self.longest_first:
+            pos = max(range(len(self.ready)), key=lambda i: (float('inf') if self.ready[i][2] is None else self.ready[i][2], -i)) # 同等时先生成者优先
+        else:
+            pos = 0
+        return self.ready.pop(pos)
+
+    def __iter__(self):
+        while True:
+            item = self.take()
+            if item is None: return
+            yield item
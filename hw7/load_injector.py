@@ -0,0 +1,81 @@
+import os
+import time
+import argparse
+import multiprocessing
+
+LOAD_PERIOD_SECONDS = 0.05 # 每个周期内忙等 duty * period, 其余时间休眠
+PAGE_STRIDE = 4096 # 内存压力模式下每次写入跨过一页, 使访问落到不同缓存行/页
+
+def parse_cores(spec):
+    """'0-3,6' -> [0, 1, 2, 3, 6]; 空串或 None 表示不绑核"""
+    if not spec: return None
+    cores = []
+    for part in str(spec).split(","):
+        if "-" in part: lo, hi = part.split("-"); cores.extend(range(int(lo), int(hi) + 1))
+        elif part.strip(): cores.append(int(part))
+    return cores
+
+def _burn(core, duty, period, memory_mb, stop):
+    """单个负载进程: 绑定到 core (若支持), 以 duty 占空比忙等; memory_mb > 0 时忙等期间按页步进写入缓冲区以制造内存带宽竞争"""
+    if core is not None and hasattr(os, "sched_setaffinity"):
+        try: os.sched_setaffinity(0, {core})
+        except OSError: pass
+    buf = bytearray(memory_mb << 20) if memory_mb > 0 else None; pos = 0; x = 1
+    while not stop.is_set():
+        busy_until = time.perf_counter() + duty * period
+        while time.perf_counter() < busy_until:
+            if buf is not None: buf[pos] = (buf[pos] + 1) & 0xFF; pos = (pos + PAGE_STRIDE + 64) % len(buf)
+            else: x = (x * 1103515245 + 12345) & 0x7FFFFFFF
+        if duty < 1.0: stop.wait((1.0 - duty) * period)
+
+class LoadInjector:
+    """在测试期间运行的后台 CPU/内存负载: processes 个忙等进程, 轮流绑定到 cores 中的核心, 每个进程的目标占空比为 duty"""
+    def __init__(self, processes, duty=1.0, cores=None, memory_mb=0, period=LOAD_PERIOD_SECONDS):
+        self.processes = processes; self.duty = min(1.0, max(0.0, duty)); self.cores = list(cores) if cores else None
+        self.memory_mb = memory_mb; self.period = period; self.workers = []; self.stop_event = None
+
+    def start(self):
+        if self.processes <= 0 or self.duty <= 0: return self
+        self.stop_event = multiprocessing.Event()
+        for i in range(self.processes):
+            core = self.cores[i % len(self.cores)] if self.cores else None
+            worker = multiprocessing.Process(target=_burn, args=(core, self.duty, self.period, self.memory_mb, self.stop_event), daemon=True)
+            worker.start(); self.workers.append(worker)
+        return self
+
+    def stop(self, timeout=2.0):
+        if self.stop_event is not None: self.stop_event.set()
+        for worker in self.workers:
+            worker.join(timeout)
+            if worker.is_alive(): worker.terminate(); worker.join(timeout)
+        self.workers = []
+
+    def __enter__(self): return self.start()
+    def __exit__(self, *exc): self.stop()
+
+    def describe(self):
+        """当前负载水平 (随每个结果记录): 配置的进程数/占空比/核心/内存, 等效满载核数及系统 1 分钟平均负载"""
+        d = {"processes": self.processes, "duty": self.duty, "cores": self.cores, "memory_mb": self.memory_mb,
+             "cpu_equivalent": self.processes * self.duty}
+        if hasattr(os, "getloadavg"): d["loadavg_1m"] = os.getloadavg()[0]
+        return d
+
+    def label(self):
+        cores = ",".join(map(str, self.cores)) if self.cores else "any"
+        return f"load {self.processes}x{self.duty:.0%} cores={cores}" + (f" mem={self.memory_mb}MB" if self.memory_mb else "")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="后台 CPU/内存负载注入 (Ctrl-C 结束)")
+    parser.add_argument("-p", "--processes", type=int, default=os.cpu_count() or 1, help="负载进程数 (默认 CPU 核数)")
+    parser.add_argument("--duty", type=float, default=1.0, help="每个进程的目标占空比 0-1")
+    parser.add_argument("--cores", help="绑定的核心, 如 0-3,6 (仅 Linux)")
+    parser.add_argument("--memory", type=int, default=0, help="每个进程的内存压力缓冲区 (MB)")
+    parser.add_argument("--duration", type=float, help="运行秒数 (默认直到 Ctrl-C)")
+    args = parser.parse_args()
+    injector = LoadInjector(args.processes, args.duty, parse_cores(args.cores), args.memory)
+    print(f"负载注入: {injector.label()}")
+    with injector:
+        try:
+            deadline = time.monotonic() + args.duration if args.duration else None
+            while deadline is None or time.monotonic() < deadline: time.sleep(1.0)
+        except KeyboardInterrupt: pass
@@ -0,0 +1,101 @@
+import sys
+import shutil
+import pathlib
+import argparse
+import tempfile
+
+from generate_data import check_request_constraints
+from failure_signature import failure_signature
+from run_test import run_tests_parallel, print_color, Fore, Style, BASE_DIR, JAR_FILE, MAX_WORKERS
+
+MINIMIZE_SUBDIR_PREFIX = "min"
+
+def _write_candidate(lines, path):
+    with open(path, "w", encoding='utf-8') as f:
+        for line in lines: f.write(line + "\n")
+
+class InputMinimizer:
+    """对失败输入做 delta debugging (ddmin): 每轮把当前请求集划分为 n 块, 并行运行所有 "单块" 与 "去掉一块" 的合法候选,
+    取能复现同一失败签名的最小候选继续; 无候选复现时加倍粒度, 直到粒度达到单条请求"""
+    def __init__(self, input_path, jar_path, test_type, workers=MAX_WORKERS, repeats=1):
+        self.input_path = pathlib.Path(input_path); self.jar_path = pathlib.Path(jar_path)
+        self.test_type = test_type; self.workers = workers; self.repeats = repeats
+        self.work_dir = pathlib.Path(tempfile.mkdtemp(prefix="minimize_", dir=BASE_DIR))
+        self.round = 0; self.runs = 0
+
+    def _run_candidates(self, candidates):
+        """并行运行候选 (每个重复 repeats 次), 返回每个候选的签名列表"""
+        jobs = []
+        for ci, lines in enumerate(candidates):
+            path = self.work_dir / f"cand_{self.round}_{ci}.txt"; _write_candidate(lines, path)
+            for rep in range(self.repeats):
+                config = {'type': self.test_type, 'stdin_file': str(path), 'jar_file': str(self.jar_path), 'save_artifacts': False}
+                jobs.append((f"{MINIMIZE_SUBDIR_PREFIX}{self.round}_{ci}_{rep}", config))
+        self.runs += len(jobs)
+        results = run_tests_parallel(jobs, self.work_dir, max_workers=self.workers)
+        return [[failure_signature(r) for r in results[ci * self.repeats:(ci + 1) * self.repeats]] for ci in range(len(candidates))]
+
+    def _legal(self, lines):
+        return not check_request_constraints(lines, is_mutual_test=(self.test_type == 'mutual'))
+
+    def minimize(self):
+        with open(self.input_path, "r", encoding='utf-8') as f:
+            current = [line.strip() for line in f if line.strip()]
+        print_color(f"原始输入: {len(current)} 条请求, 复现基准签名...", Style.BRIGHT)
+        target = next((sig for sig in self._run_candidates([current])[0] if sig), None)
+        if target is None:
+            print_color("原始输入未能复现失败, 中止最小化 (可尝试增大 --repeats).", Fore.YELLOW)
+            return None, current
+        print_color(f"目标签名: {target}", Fore.CYAN)
+
+        n = 2
+        while len(current) >= 2:
+            self.round += 1
+            chunk_size = -(-len(current) // n)
+            chunks = [current[i:i + chunk_size] for i in range(0, len(current), chunk_size)]
+            candidates = chunks + ([[l for j, c in enumerate(chunks) if j != i for l in c] for i in range(len(chunks))] if len(chunks) > 2 else [])
+            unique = []
+            for cand in candidates:
+                if cand and cand != current and cand not in unique and self._legal(cand): unique.append(cand)
+            print(f"\n--- 第 {self.round} 轮: {len(current)} 条请求, 粒度 {n}, 合法候选 {len(unique)} ---")
+            reproducing = []
+            if unique:
+                for cand, sigs in zip(unique, self._run_candidates(unique)):
+                    if target in sigs: reproducing.append(cand)
+            if reproducing:
+                best = min(reproducing, key=len)
+                is_chunk = best in chunks
+                current = best; n = 2 if is_chunk else max(n - 1, 2)
+                print_color(f"  缩小到 {len(current)} 条请求", Fore.GREEN)
+            elif n >= len(current):
+                break
+            else:
+                n = min(len(current), n * 2)
+        return target, current
+
+    def cleanup(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HW7 失败输入最小化 (delta debugging, 并行复现)")
+    parser.add_argument("input", help="失败输入文件 (如 test_results_hw7/failed_data_3_public.txt)")
+    parser.add_argument("--jar", default=str(JAR_FILE), help="被测 jar (默认 code.jar)")
+    parser.add_argument("--mode", choices=["public", "mutual"], help="测试模式 (默认从文件名推断)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="并行数")
+    parser.add_argument("--repeats", type=int, default=1, help="每个候选重复运行次数 (偶发错误时增大)")
+    parser.add_argument("--output", help="输出文件 (默认 <输入>_min.txt)")
+    args = parser.parse_args()
+
+    input_path = pathlib.Path(args.input)
+    mode = args.mode or ("mutual" if "mutual" in input_path.stem else "public")
+    minimizer = InputMinimizer(input_path, args.jar, mode, workers=args.workers, repeats=args.repeats)
+    try:
+        target, minimal = minimizer.minimize()
+    finally:
+        minimizer.cleanup()
+    if target is None: sys.exit(1)
+    output_path = pathlib.Path(args.output) if args.output else input_path.with_name(f"{input_path.stem}_min.txt")
+    _write_candidate(minimal, output_path)
+    print_color(f"\n最小输入 ({len(minimal)} 条请求, 共运行 {minimizer.runs} 次) 已写入 {output_path}", Fore.GREEN)
+    print(f"失败签名: {target}")
+    for line in minimal: print(f"  {line}")
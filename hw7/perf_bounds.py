@@ -0,0 +1,70 @@
+import argparse
+import pathlib
+
+from validator import OutputValidator, MOVE_TIME_DEFAULT, DOUBLE_CAR_SPEED, MAX_CAPACITY, SCHE_HOLD_TIME, UPDATE_HOLD_TIME
+
+START_FLOOR = 1 # 所有电梯初始位于 F1
+ARRIVE_ENERGY = 0.4; OPEN_ENERGY = 0.1; CLOSE_ENERGY = 0.1
+
+def floor_distance(from_floor, to_floor):
+    """楼层间移动次数 (B1 与 F1 相邻)"""
+    return abs(from_floor - to_floor) - (1 if from_floor * to_floor < 0 else 0)
+
+def directed_edges(from_floor, to_floor):
+    """从 from_floor 移动到 to_floor 经过的有向边 (相邻楼层对)"""
+    step = 1 if to_floor > from_floor else -1; edges = []; floor = from_floor
+    while floor != to_floor:
+        nxt = floor + step
+        if nxt == 0: nxt += step
+        edges.append((floor, nxt)); floor = nxt
+    return edges
+
+def compute_bounds(validator):
+    """根据 parse_stdin 的请求计算与调度策略无关的下界:
+    WT: 每位乘客完成时间至少为 距离 x 最快可用速度 (仅当某 UPDATE 可能在其理论最早到达前完成时按双轿厢速度), 按优先级加权;
+    W: ARRIVE 次数不少于乘客行程 (无 UPDATE 时还包括从 F1 到各上下客楼层) 的有向边并集大小, 也不少于总行程 / 容量;
+       开关门次数不少于上下客楼层数、SCHE 数和乘客数 / 容量 (每次开门至多进入 MAX_CAPACITY 人);
+    T_run: 最晚的 (请求时间 + 最短服务时间)"""
+    update_ready_times = sorted(r['time'] + UPDATE_HOLD_TIME for r in validator.raw_requests if r['type'] == 'u')
+    has_update = bool(update_ready_times)
+    weighted = 0.0; total_priority = 0; t_run = 0.0
+    edges = set(); door_floors = set(); sche_count = 0; total_distance = 0; passenger_count = 0
+    for req in validator.raw_requests:
+        if req['type'] == 'p':
+            p = validator.passengers.get(req['id'])
+            priority = p.priority if p else 1
+            distance = floor_distance(req['from'], req['to'])
+            slow_finish = req['time'] + distance * MOVE_TIME_DEFAULT
+            speed = DOUBLE_CAR_SPEED if has_update and update_ready_times[0] < slow_finish else MOVE_TIME_DEFAULT
+            min_time = distance * speed
+            weighted += min_time * priority; total_priority += priority; t_run = max(t_run, req['time'] + min_time)
+            edges.update(directed_edges(req['from'], req['to'])); door_floors.update((req['from'], req['to']))
+            total_distance += distance; passenger_count += 1
+        elif req['type'] == 's':
+            sche_count += 1; t_run = max(t_run, req['time'] + SCHE_HOLD_TIME)
+        elif req['type'] == 'u':
+            t_run = max(t_run, req['time'] + UPDATE_HOLD_TIME)
+    if not has_update: # UPDATE 会把轿厢直接放到换乘层附近 (无 ARRIVE), 此时该项不成立
+        for floor in door_floors: edges.update(directed_edges(START_FLOOR, floor))
+    arrives = max(len(edges), -(-total_distance // MAX_CAPACITY))
+    door_cycles = max(len(door_floors), sche_count, -(-passenger_count // MAX_CAPACITY))
+    return {"T_run": t_run, "WT": weighted / total_priority if total_priority else 0.0,
+            "W": ARRIVE_ENERGY * arrives + (OPEN_ENERGY + CLOSE_ENERGY) * door_cycles,
+            "Arrives": arrives, "Opens": door_cycles, "Closes": door_cycles}
+
+def bounds_for_input(stdin_path):
+    return compute_bounds(OutputValidator(stdin_path))
+
+def bound_ratios(perf, bounds):
+    """实际指标与下界之比 (T_run/WT/W); 越接近 1 越接近最优"""
+    if not perf or not bounds: return {}
+    return {metric: perf[metric] / bounds[metric] for metric in ("T_run", "WT", "W") if bounds.get(metric) and metric in perf}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HW7 输入的 T_run/WT/W 理论下界")
+    parser.add_argument("inputs", nargs="+", help="stdin 格式的输入文件")
+    args = parser.parse_args()
+    for input_path in args.inputs:
+        b = bounds_for_input(input_path)
+        print(f"{pathlib.Path(input_path).name}: T_run >= {b['T_run']:.3f}, WT >= {b['WT']:.3f}, W >= {b['W']:.2f} "
+              f"(Arr >= {b['Arrives']}, Op/Cl >= {b['Opens']})")
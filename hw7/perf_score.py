@@ -0,0 +1,115 @@
+import math
+import json
+import shutil
+import pathlib
+import argparse
+import tempfile
+
+from input_pipeline import InputPipeline
+from campaign_stats import RunningStat
+from run_test import (run_tests_parallel, make_test_config, generate_input, print_color, Fore, Style,
+                      BASE_DIR, JAR_FILE, MAX_WORKERS)
+
+SCORE_P = 0.1 # 课程性能分计算中的 p (base_min/base_max 靠近房间内的 min/max)
+SCORE_WEIGHTS = {"T_run": 0.3, "WT": 0.3, "W": 0.4}
+SCORE_REPORT_FILENAME = "perf_score_report.json"
+
+def relative_scores(values, p=SCORE_P):
+    """官方相对评分: 对同一输入上所有正确提交的某项指标 x, 以 avg/min/max 得到
+    base_min = p*avg + (1-p)*min, base_max = p*avg + (1-p)*max;
+    r(x) = 1 (x <= base_min), 0 (x >= base_max), 否则 (base_max - x) / (base_max - base_min).
+    values: {jar: x}, 返回 {jar: r}"""
+    finite = {jar: x for jar, x in values.items() if x is not None and math.isfinite(x)}
+    if not finite: return {jar: 0.0 for jar in values}
+    xs = list(finite.values()); x_avg = sum(xs) / len(xs)
+    base_min = p * x_avg + (1 - p) * min(xs); base_max = p * x_avg + (1 - p) * max(xs)
+    scores = {}
+    for jar in values:
+        x = finite.get(jar)
+        if x is None: scores[jar] = 0.0
+        elif x <= base_min: scores[jar] = 1.0
+        elif x >= base_max: scores[jar] = 0.0
+        else: scores[jar] = (base_max - x) / (base_max - base_min)
+    return scores
+
+def score_test(perf_by_jar, p=SCORE_P, weights=SCORE_WEIGHTS):
+    """单个输入的评分. perf_by_jar: {jar: performance dict 或 None (未通过)}.
+    返回 {jar: {'T_run': r, 'WT': r, 'W': r, 'total': 加权和}}, 未通过的 jar 记 0 分且不参与基准计算"""
+    passed = {jar: perf for jar, perf in perf_by_jar.items() if perf}
+    scores = {jar: {metric: 0.0 for metric in weights} for jar in perf_by_jar}
+    for metric in weights:
+        for jar, r in relative_scores({jar: perf.get(metric) for jar, perf in passed.items()}, p).items(): scores[jar][metric] = r
+    for jar in scores: scores[jar]["total"] = sum(weights[m] * scores[jar][m] for m in weights)
+    return scores
+
+def rank_jars(per_test_scores):
+    """汇总各输入评分, 返回按平均总分降序的 [(jar, {指标: RunningStat})]"""
+    totals = {}
+    for scores in per_test_scores:
+        for jar, s in scores.items():
+            stats = totals.setdefault(jar, {metric: RunningStat() for metric in s})
+            for metric, value in s.items(): stats[metric].add(value)
+    return sorted(totals.items(), key=lambda kv: -kv[1]["total"].mean)
+
+def run_room(jars, mode, num_inputs, workers=MAX_WORKERS, work_dir=None):
+    """在 num_inputs 个相同的随机输入上运行所有 jar, 返回 [(seed, {jar: result})]"""
+    work_dir = pathlib.Path(work_dir)
+    pipeline = InputPipeline(((i, make_test_config(mode)) for i in range(num_inputs)), work_dir, generate_input, longest_first=False).start()
+    inputs = [(config, pathlib.Path(config['stdin_file'])) for _, config, _ in pipeline if 'stdin_file' in config]
+    jobs = []
+    for i, (config, path) in enumerate(inputs): # 同一输入的各 jar 相邻提交, 起始 jar 轮换
+        for k in range(len(jars)):
+            j = (i + k) % len(jars)
+            jobs.append((f"room{j}_{i}", {'type': mode, 'stdin_file': str(path), 'jar_file': str(jars[j]), 'save_artifacts': False}))
+    print_color(f"--- 性能评分: {len(inputs)} 个输入 x {len(jars)} 个 jar, 并行数 {workers} ---", Style.BRIGHT)
+    results = run_tests_parallel(jobs, work_dir, max_workers=workers)
+    by_key = {job[0]: result for job, result in zip(jobs, results)}
+    return [(config['seed'], {jars[j].name: by_key[f"room{j}_{i}"] for j in range(len(jars))}) for i, (config, path) in enumerate(inputs)]
+
+def print_ranking(ranking, num_inputs):
+    print("\n" + "=" * 20 + f" 相对性能评分 ({num_inputs} 个输入, p={SCORE_P}) " + "=" * 20)
+    print(f"  {'排名':<5}{'jar':<28}{'总分':>8}{'±95%CI':>9}{'T_run':>8}{'WT':>8}{'W':>8}")
+    for rank, (jar, stats) in enumerate(ranking, 1):
+        ci = f"{stats['total'].ci95:.3f}" if stats['total'].n > 1 else "-"
+        print_color(f"  {rank:<5}{jar[:27]:<28}{stats['total'].mean:>8.3f}{ci:>9}{stats['T_run'].mean:>8.3f}{stats['WT'].mean:>8.3f}{stats['W'].mean:>8.3f}",
+                    Fore.GREEN if rank == 1 else Fore.WHITE)
+    print(f"总分 = {' + '.join(f'{w} * r({m})' for m, w in SCORE_WEIGHTS.items())}, 未通过的输入记 0 分")
+
+def collect_jars(paths):
+    jars = []
+    for p in map(pathlib.Path, paths):
+        if p.is_dir(): jars.extend(sorted(p.glob("*.jar")))
+        elif p.exists(): jars.append(p)
+        else: print_color(f"警告: 找不到 {p}", Fore.YELLOW)
+    return [jar.resolve() for jar in jars]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HW7 多个 jar 在相同输入上的官方式相对性能评分")
+    parser.add_argument("jars", nargs="*", help="jar 文件或包含 jar 的目录 (默认仅 code.jar, 需至少两个才有意义)")
+    parser.add_argument("--mode", choices=["public", "mutual"], default="public")
+    parser.add_argument("-n", "--inputs", type=int, default=20, help="输入数量")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--output", help=f"报告 JSON (默认 {SCORE_REPORT_FILENAME})")
+    args = parser.parse_args()
+
+    jars = collect_jars(args.jars or [JAR_FILE])
+    if len({jar.name for jar in jars}) != len(jars): print_color("错误: jar 文件名需互不相同.", Fore.RED); raise SystemExit(1)
+    if len(jars) < 2: print_color("警告: 少于两个 jar, 相对评分恒为满分.", Fore.YELLOW)
+    work_dir = pathlib.Path(tempfile.mkdtemp(prefix="score_", dir=BASE_DIR))
+    try:
+        room = run_room(jars, args.mode, args.inputs, args.workers, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    per_test = []
+    for seed, results in room:
+        per_test.append(score_test({jar: (r.get("performance") if r.get("status") == "PASS" else None) for jar, r in results.items()}))
+    ranking = rank_jars(per_test)
+    print_ranking(ranking, len(room))
+    output_path = pathlib.Path(args.output) if args.output else BASE_DIR / SCORE_REPORT_FILENAME
+    with open(output_path, "w", encoding='utf-8') as f:
+        json.dump({"mode": args.mode, "p": SCORE_P, "weights": SCORE_WEIGHTS,
+                   "ranking": [{"jar": jar, **{m: st.to_dict() for m, st in stats.items()}} for jar, stats in ranking],
+                   "tests": [{"seed": seed, "status": {jar: r.get("status") for jar, r in results.items()}, "scores": scores}
+                             for (seed, results), scores in zip(room, per_test)]},
+                  f, ensure_ascii=False, indent=2, default=str)
+    print(f"报告已写入 {output_path}")
@@ -0,0 +1,137 @@
+import os
+import sys
+import time
+import signal
+import subprocess
+try:
+    import resource # 仅 POSIX, 用于设置子进程资源上限
+except ImportError:
+    resource = None
+
+IS_WINDOWS = (os.name == 'nt')
+TERMINATE_GRACE_SECONDS = 2.0
+
+def apply_rlimit(res, soft, hard):
+    """设置资源上限; 非特权进程不能提高硬上限, 因此不超过当前硬上限"""
+    _, cur_hard = resource.getrlimit(res)
+    if cur_hard != resource.RLIM_INFINITY: hard = min(hard, cur_hard); soft = min(soft, hard)
+    try: resource.setrlimit(res, (soft, hard))
+    except (ValueError, OSError): pass
+
+def count_user_threads(uid=None):
+    """当前用户 (实际 UID) 的线程总数, 即 RLIMIT_NPROC 计数的对象; 无 /proc 时返回 None"""
+    if not os.path.isdir("/proc"): return None
+    uid = os.getuid() if uid is None else uid; total = 0
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit(): continue
+        try:
+            with open(f"/proc/{entry}/status", "r") as f: fields = dict(line.split(":", 1) for line in f if ":" in line)
+            if int(fields["Uid"].split()[0]) == uid: total += int(fields["Threads"])
+        except (OSError, KeyError, ValueError): continue
+    return total
+
+def popen_group_kwargs(cores=None, limits=None):
+    """返回使子进程独立成组 (POSIX: 新会话; Windows: 新进程组) 的 Popen 参数.
+    仅 POSIX: cores 非空时子进程在 exec 前绑定到这些核心 (Linux), limits ({RLIMIT_*: (soft, hard)}) 非空时设置资源上限;
+    两者均由管道中的 datainput 与 java 及其所有线程继承"""
+    if IS_WINDOWS:
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    kwargs = {"start_new_session": True}
+    core_set = set(cores) if cores and hasattr(os, "sched_setaffinity") else None
+    limits = limits if resource is not None else None
+    if core_set or limits:
+        def preexec():
+            if core_set: os.sched_setaffinity(0, core_set)
+            for res, (soft, hard) in (limits or {}).items(): apply_rlimit(res, soft, hard)
+        kwargs["preexec_fn"] = preexec
+    return kwargs
+
+def available_cores():
+    """当前进程可用的 CPU 核心编号"""
+    if hasattr(os, "sched_getaffinity"): return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def allocate_core_sets(count, per_set, exclude=()):
+    """把可用核心 (去掉 exclude) 划分为 count 个互不相交、各 per_set 个的核心组; 核心不足时缩小每组大小, 每组不足 1 个核心时返回 None"""
+    cores = [c for c in available_cores() if c not in set(exclude or ())]
+    per_set = min(per_set, len(cores) // count) if count > 0 else 0
+    if per_set < 1: return None
+    return [cores[i * per_set:(i + 1) * per_set] for i in range(count)]
+
+def _group_alive(pgid):
+    try:
+        os.killpg(pgid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+def kill_process_tree(process, grace_seconds=TERMINATE_GRACE_SECONDS):
+    """终止 process 所在的整个进程组: 先发送温和信号, 宽限期后强杀. 返回是否需要强杀"""
+    if process is None: return False
+    if IS_WINDOWS:
+        subprocess.run(["taskkill", "/T", "/PID", str(process.pid)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            process.wait(timeout=grace_seconds)
+            return False
+        except subprocess.TimeoutExpired:
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            return True
+    pgid = process.pid # start_new_session=True 时 pgid == pid
+    try: os.killpg(pgid, signal.SIGTERM)
+    except ProcessLookupError: return False
+    deadline = time.monotonic() + grace_seconds
+    while time.monotonic() < deadline:
+        if process.poll() is not None and not _group_alive(pgid): return False
+        time.sleep(0.05)
+    try: os.killpg(pgid, signal.SIGKILL)
+    except ProcessLookupError: return False
+    return True
+
+def _iter_proc_entries():
+    """Linux: 遍历 /proc, 产出 (pid, cmdline, cwd)"""
+    for name in os.listdir("/proc"):
+        if not name.isdigit(): continue
+        pid = int(name)
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                cmdline = f.read().replace(b"\0", b" ").decode("utf-8", "replace").strip()
+            cwd = os.readlink(f"/proc/{pid}/cwd")
+        except (OSError, ValueError):
+            continue
+        yield pid, cmdline, cwd
+
+def find_stray_processes(base_dir, subdir_prefix, markers):
+    """查找仍在运行的测试进程 (java / 数据投喂程序). 返回 [(pid, cmdline)]
+    POSIX 下按工作目录 (测试子目录) 匹配; Windows 下按命令行包含全部 markers 匹配"""
+    base_dir = str(base_dir); strays = []
+    if IS_WINDOWS:
+        try:
+            out = subprocess.run(["wmic", "process", "get", "ProcessId,CommandLine", "/format:csv"],
+                                 capture_output=True, text=True, errors='replace', timeout=30).stdout
+        except (OSError, subprocess.SubprocessError):
+            return strays
+        for line in out.splitlines():
+            parts = line.strip().rsplit(",", 1)
+            if len(parts) != 2 or not parts[1].isdigit(): continue
+            cmdline = parts[0].split(",", 1)[-1]
+            if all(m in cmdline for m in markers): strays.append((int(parts[1]), cmdline))
+        return strays
+    if not os.path.isdir("/proc"): return strays
+    own_pid = os.getpid()
+    for pid, cmdline, cwd in _iter_proc_entries():
+        if pid == own_pid: continue
+        if cwd.startswith(base_dir) and os.path.basename(cwd).startswith(subdir_prefix): strays.append((pid, cmdline))
+    return strays
+
+def reap_stray_processes(base_dir, subdir_prefix, markers):
+    """强杀残留的测试进程, 返回被清理的 [(pid, cmdline)]"""
+    strays = find_stray_processes(base_dir, subdir_prefix, markers)
+    for pid, _ in strays:
+        try:
+            if IS_WINDOWS: subprocess.run(["taskkill", "/F", "/T", "/PID", str(pid)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            else: os.kill(pid, signal.SIGKILL)
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"清理进程 {pid} 失败: {e}", file=sys.stderr)
+    return strays
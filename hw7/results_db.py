@@ -0,0 +1,182 @@
+import json
+import math
+import socket
+import sqlite3
+import hashlib
+import pathlib
+import argparse
+import datetime
+
+from failure_signature import failure_signature
+
+DB_FILENAME = "test_history_hw7.sqlite" # 位于 BASE_DIR, 不随结果目录清理
+MAX_STORED_ERRORS = 20 # 每个测试保存的错误条数上限
+PERF_COLUMNS = ["T_run", "WT", "W", "Arrives", "Opens", "Closes"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL, finished_at TEXT, mode TEXT NOT NULL,
+    jar_path TEXT, jar_sha256 TEXT, host TEXT, note TEXT,
+    planned_tests INTEGER, total INTEGER, passed INTEGER, duration REAL
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    campaign_id INTEGER NOT NULL REFERENCES campaigns(id),
+    test_index TEXT, type TEXT, status TEXT NOT NULL, signature TEXT,
+    seed INTEGER, config TEXT, input_sha256 TEXT, errors TEXT,
+    real_time REAL, cpu_user REAL, cpu_sys REAL, timeout_seconds REAL,
+    T_run REAL, WT REAL, W REAL, Arrives INTEGER, Opens INTEGER, Closes INTEGER,
+    recorded_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_campaign ON results(campaign_id);
+CREATE INDEX IF NOT EXISTS idx_results_status ON results(status);
+CREATE INDEX IF NOT EXISTS idx_results_signature ON results(signature);
+CREATE INDEX IF NOT EXISTS idx_campaigns_jar ON campaigns(jar_sha256);
+"""
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""): digest.update(chunk)
+    return digest.hexdigest()
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+def _finite(value):
+    """inf/nan 存为 NULL, 避免污染 AVG 等聚合"""
+    if value is None: return None
+    try: return value if math.isfinite(value) else None
+    except TypeError: return None
+
+class ResultStore:
+    """跨测试轮次的结果历史库 (SQLite). 只应在主进程中写入"""
+    def __init__(self, db_path):
+        self.db_path = pathlib.Path(db_path)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def start_campaign(self, mode, jar_path, planned_tests=None, note=None):
+        jar_path = pathlib.Path(jar_path)
+        jar_hash = file_sha256(jar_path) if jar_path.exists() else None
+        cur = self.conn.execute("INSERT INTO campaigns (started_at, mode, jar_path, jar_sha256, host, note, planned_tests) "
+                                "VALUES (?, ?, ?, ?, ?, ?, ?)", (_now(), mode, str(jar_path), jar_hash, socket.gethostname(), note, planned_tests))
+        self.conn.commit()
+        return cur.lastrowid
+
+    def record_result(self, campaign_id, result, config=None):
+        perf = result.get("performance") or {}
+        config = dict(config or {})
+        input_path = config.pop("stdin_file", None)
+        if result.get("contention"): config["contention"] = result["contention"] # 负载注入水平 (见 load_injector.py)
+        input_hash = file_sha256(input_path) if input_path and pathlib.Path(input_path).exists() else result.get("input_sha256")
+        errors = [e for e in (result.get("errors") or [])][:MAX_STORED_ERRORS]
+        self.conn.execute(
+            "INSERT INTO results (campaign_id, test_index, type, status, signature, seed, config, input_sha256, errors, "
+            "real_time, cpu_user, cpu_sys, timeout_seconds, T_run, WT, W, Arrives, Opens, Closes, recorded_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (campaign_id, str(result.get("index")), result.get("type"), result.get("status", "UNKNOWN"), failure_signature(result),
+             result.get("seed", config.get("seed")), json.dumps(config, ensure_ascii=False, default=str), input_hash,
+             json.dumps(errors, ensure_ascii=False), _finite(result.get("real_time_taken")), result.get("cpu_user"), result.get("cpu_sys"),
+             _finite(result.get("timeout_seconds"))) + tuple(_finite(perf.get(col)) for col in PERF_COLUMNS) + (_now(),))
+        self.conn.commit()
+
+    def finish_campaign(self, campaign_id, duration=None):
+        self.conn.execute("UPDATE campaigns SET finished_at = ?, duration = ?, "
+                          "total = (SELECT COUNT(*) FROM results WHERE campaign_id = ?), "
+                          "passed = (SELECT COUNT(*) FROM results WHERE campaign_id = ? AND status = 'PASS') WHERE id = ?",
+                          (_now(), duration, campaign_id, campaign_id, campaign_id))
+        self.conn.commit()
+
+    def campaigns(self, mode=None, limit=20):
+        sql = "SELECT * FROM campaigns" + (" WHERE mode = ?" if mode else "") + " ORDER BY id DESC LIMIT ?"
+        return self.conn.execute(sql, ((mode,) if mode else ()) + (limit,)).fetchall()
+
+    def jar_trends(self, mode=None, limit=20):
+        """按 jar 版本 (哈希) 汇总: 首次出现时间, 测试数, 通过率, 通过测试的平均性能"""
+        where = "WHERE c.mode = ?" if mode else ""
+        sql = (f"SELECT c.jar_sha256 AS jar, MIN(c.started_at) AS first_seen, COUNT(DISTINCT c.id) AS campaigns, COUNT(r.id) AS tests, "
+               f"SUM(r.status = 'PASS') AS passed, "
+               f"AVG(CASE WHEN r.status = 'PASS' THEN r.T_run END) AS T_run, AVG(CASE WHEN r.status = 'PASS' THEN r.WT END) AS WT, "
+               f"AVG(CASE WHEN r.status = 'PASS' THEN r.W END) AS W, AVG(r.cpu_user + r.cpu_sys) AS cpu "
+               f"FROM campaigns c JOIN results r ON r.campaign_id = c.id {where} "
+               f"GROUP BY c.jar_sha256 ORDER BY first_seen DESC LIMIT ?")
+        return self.conn.execute(sql, ((mode,) if mode else ()) + (limit,)).fetchall()
+
+    def similar_runtime(self, config, passenger_tolerance=5):
+        """与 config 相同模式、SCHE/UPDATE 数相同且乘客请求数相近的历史通过测试: (样本数, 平均实际耗时)"""
+        row = self.conn.execute(
+            "SELECT COUNT(*), AVG(real_time) FROM results WHERE status = 'PASS' AND type = ? AND real_time IS NOT NULL "
+            "AND json_extract(config, '$.sche_reqs') = ? AND json_extract(config, '$.update_reqs') = ? "
+            "AND ABS(json_extract(config, '$.passenger_reqs') - ?) <= ?",
+            (config.get("type"), config.get("sche_reqs"), config.get("update_reqs"), config.get("passenger_reqs", 0), passenger_tolerance)).fetchone()
+        return row[0], row[1]
+
+    def slowest(self, metric="T_run", mode=None, jar=None, limit=20):
+        column = {"T_run": "r.T_run", "WT": "r.WT", "W": "r.W", "real_time": "r.real_time", "cpu": "(r.cpu_user + r.cpu_sys)"}[metric]
+        conditions = [f"{column} IS NOT NULL"]; params = []
+        if mode: conditions.append("r.type = ?"); params.append(mode)
+        if jar: conditions.append("c.jar_sha256 LIKE ?"); params.append(jar + "%")
+        sql = (f"SELECT r.*, {column} AS value, c.jar_sha256 AS jar, c.started_at FROM results r JOIN campaigns c ON r.campaign_id = c.id "
+               f"WHERE {' AND '.join(conditions)} ORDER BY value DESC LIMIT ?")
+        return self.conn.execute(sql, tuple(params) + (limit,)).fetchall()
+
+    def common_failures(self, mode=None, jar=None, limit=20):
+        conditions = ["r.status != 'PASS'"]; params = []
+        if mode: conditions.append("r.type = ?"); params.append(mode)
+        if jar: conditions.append("c.jar_sha256 LIKE ?"); params.append(jar + "%")
+        sql = (f"SELECT r.signature, COUNT(*) AS count, COUNT(DISTINCT c.jar_sha256) AS jars, MAX(c.started_at) AS last_seen, "
+               f"MIN(r.seed) AS example_seed, MAX(r.campaign_id) AS last_campaign "
+               f"FROM results r JOIN campaigns c ON r.campaign_id = c.id WHERE {' AND '.join(conditions)} "
+               f"GROUP BY r.signature ORDER BY count DESC LIMIT ?")
+        return self.conn.execute(sql, tuple(params) + (limit,)).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+def _fmt(value, spec=".3f"):
+    return "-" if value is None else format(value, spec)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HW7 测试历史查询")
+    parser.add_argument("--db", default=str(pathlib.Path(__file__).parent.resolve() / DB_FILENAME), help="历史库路径")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_camp = sub.add_parser("campaigns", help="最近的测试轮次"); p_camp.add_argument("--mode"); p_camp.add_argument("--limit", type=int, default=20)
+    p_trend = sub.add_parser("trends", help="各 jar 版本的通过率与平均性能"); p_trend.add_argument("--mode"); p_trend.add_argument("--limit", type=int, default=20)
+    p_slow = sub.add_parser("slowest", help="指标最差的输入")
+    p_slow.add_argument("--metric", choices=["T_run", "WT", "W", "real_time", "cpu"], default="T_run")
+    p_slow.add_argument("--mode"); p_slow.add_argument("--jar", help="jar 哈希前缀"); p_slow.add_argument("--limit", type=int, default=20)
+    p_fail = sub.add_parser("failures", help="最常见的失败签名")
+    p_fail.add_argument("--mode"); p_fail.add_argument("--jar", help="jar 哈希前缀"); p_fail.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if not pathlib.Path(args.db).exists(): print(f"历史库不存在: {args.db}"); raise SystemExit(1)
+    store = ResultStore(args.db)
+    try:
+        if args.command == "campaigns":
+            print(f"{'ID':>5}  {'开始时间':<20}{'模式':<8}{'jar':<14}{'通过/总数':>10}{'耗时(s)':>10}")
+            for row in store.campaigns(args.mode, args.limit):
+                counts = f"{row['passed'] or 0}/{row['total'] or 0}"
+                print(f"{row['id']:>5}  {row['started_at']:<20}{row['mode']:<8}{(row['jar_sha256'] or '-')[:12]:<14}"
+                      f"{counts:>10}{_fmt(row['duration'], '.1f'):>10}")
+        elif args.command == "trends":
+            print(f"{'jar':<14}{'首次出现':<21}{'轮次':>5}{'测试':>7}{'通过率':>9}{'T_run':>10}{'WT':>10}{'W':>10}{'CPU(s)':>9}")
+            for row in store.jar_trends(args.mode, args.limit):
+                rate = row['passed'] / row['tests'] if row['tests'] else 0.0
+                print(f"{(row['jar'] or '-')[:12]:<14}{row['first_seen']:<21}{row['campaigns']:>5}{row['tests']:>7}{rate:>9.1%}"
+                      f"{_fmt(row['T_run']):>10}{_fmt(row['WT']):>10}{_fmt(row['W']):>10}{_fmt(row['cpu'], '.2f'):>9}")
+        elif args.command == "slowest":
+            print(f"{args.metric:>10}  {'轮次':>5}{'测试':>7}  {'类型':<8}{'状态':<22}{'seed':>12}  jar")
+            for row in store.slowest(args.metric, args.mode, args.jar, args.limit):
+                seed = row['seed'] if row['seed'] is not None else '-'
+                print(f"{row['value']:>10.3f}  {row['campaign_id']:>5}{row['test_index']:>7}  {row['type']:<8}{row['status']:<22}"
+                      f"{seed:>12}  {(row['jar'] or '-')[:12]}")
+                print(f"            配置: {row['config']}")
+        elif args.command == "failures":
+            for row in store.common_failures(args.mode, args.jar, args.limit):
+                print(f"[{row['count']:>5}x] {row['signature'] or '-'}")
+                print(f"          jar 版本数 {row['jars']}, 最近 {row['last_seen']} (轮次 {row['last_campaign']}), 示例 seed {row['example_seed']}")
+    finally:
+        store.close()
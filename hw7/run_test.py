@@ -5,11 +5,33 @@ import sys
 import random
 import shutil
 import concurrent.futures
+from collections import deque
 import pathlib
 import traceback
+import re
+import threading
+import queue
+import json
+import math
+import multiprocessing
+import signal
+try:
+    import resource # 仅 POSIX, 用于统计子进程 CPU 时间
+except ImportError:
+    resource = None
 
 from generate_data import generate_requests_phased_hw7, ELEVATOR_COUNT, MAX_TOTAL_REQUESTS_MUTUAL, MAX_UPDATE_REQUESTS, MAX_SCHE_REQUESTS_PUBLIC
-from validator import OutputValidator
+from validator import OutputValidator, MOVE_TIME_DEFAULT, PRIORITY_BANDS, SPECIAL_STAGES, LATENCY_PERCENTILES
+from process_utils import popen_group_kwargs, kill_process_tree, reap_stray_processes, allocate_core_sets, count_user_threads
+from campaign_stats import CampaignStats
+from failure_signature import cluster_failures, save_clusters
+from results_db import ResultStore, DB_FILENAME
+from simulator import simulate_all, best_baseline
+from perf_bounds import floor_distance, bounds_for_input, bound_ratios
+from load_injector import LoadInjector, parse_cores
+from input_pipeline import InputPipeline
+from corpus import InputCorpus, CORPUS_DIRNAME, GENERATOR_PROFILE, corpus_path, config_from_row
+from thread_dump import find_java_pids, request_thread_dump, summarize_thread_dump
 
 try:
     from colorama import init, Fore, Style
@@ -31,6 +53,43 @@ OFFICIAL_JAR_FILE = BASE_DIR / "elevator3.jar"; MAIN_CLASS_NAME = "MainClass"
 STDIN_FILENAME = "stdin.txt"; TIMEOUT_SECONDS_PUBLIC = 180 # 使用调整后的公测超时
 TIMEOUT_SECONDS_MUTUAL = 220; MAX_WORKERS = 10
 TEST_SUBDIR_PREFIX = "test_run_"; RESULTS_DIR_NAME = "test_results_hw7"
+WATCHDOG_ENABLED = True; DEADLOCK_QUIET_SECONDS = 20.0 # 最后一条请求投喂后输出停滞超过该时长且仍有乘客未到达, 判定死锁
+WATCHDOG_POLL_SECONDS = 0.5
+THREAD_DUMP_ENABLED = True; THREAD_DUMP_WAIT_SECONDS = 3.0 # 超时/死锁时, 终止前请求 JVM 线程转储
+ADAPTIVE_TIMEOUT_ENABLED = True # 根据输入估计超时: 最后请求时间 + 安全系数 * 剩余服务时间估计 + 基础时间, 以固定超时为上限
+TIMEOUT_BASE_SECONDS = 10.0; TIMEOUT_MIN_SECONDS = 30.0; TIMEOUT_SAFETY_FACTOR = 2.0
+TIMEOUT_DOOR_CYCLE_SECONDS = 0.8; TIMEOUT_SPECIAL_REQUEST_SECONDS = 6.0 # 每次开关门 / 每个 SCHE、UPDATE 的服务时间估计
+STDOUT_CAPTURE_FILENAME = "stdout.txt"; STDERR_CAPTURE_FILENAME = "stderr.txt" # 输出落盘, 内存中只保留尾部
+CAPTURE_CHUNK_BYTES = 65536; MAX_LINE_BYTES = 65536; LINE_QUEUE_MAX = 10000
+STDOUT_TAIL_LINES = 20; STDERR_TAIL_LINES = 200
+OUTPUT_LAG_WARN_SECONDS = 0.1; OUTPUT_LAG_MAX_SAMPLES = 200000 # 输出行接收时间相对打印时间戳的额外延迟超过该值时警告
+SUMMARY_DETAIL_LIMIT = 20; FAILURE_CLUSTERS_FILENAME = "failure_clusters.json" # 失败数超过该值时只打印聚类结果
+CAMPAIGN_STATS_FILENAME = "campaign_stats.json"
+TIMING_SLACK_WARN_SECONDS = 0.0 # 任一时间约束的余量低于该值 (仅靠判定容差通过) 时警告
+SPECIAL_MARGIN_WARN_SECONDS = 1.0 # SCHE/UPDATE 响应距 6s 上限的余量低于该值时警告
+REPORTS_DIRNAME = "reports" # 每个测试的分析报告 (性能, 基线, 下界, 电梯利用率) 写入结果目录下的该子目录
+PERF_BOUNDS_ENABLED = True # 通过的测试计算理论下界 (perf_bounds.py) 并报告实际值与下界之比
+BASELINE_SIM_ENABLED = True # 通过的测试同时用基线模拟器 (simulator.py) 跑同一输入, 报告与基线的差距
+HISTORY_DB_ENABLED = True # 每个测试结果写入 BASE_DIR 下的 SQLite 历史库 (见 results_db.py)
+LOAD_INJECTION_ENABLED = False # 测试期间运行后台 CPU/内存负载 (load_injector.py), 模拟多人同时评测的繁忙机器
+LOAD_PROCESSES = 4; LOAD_DUTY_CYCLE = 0.8; LOAD_CORES = None; LOAD_MEMORY_MB = 0 # 负载进程数, 占空比, 绑定核心 (如 "0-3"), 每进程内存压力 (MB)
+CORE_PINNING_ENABLED = False; CORES_PER_TEST = 2 # 为每个运行中的测试分配互不相交的核心组并绑定其 JVM (仅 Linux), 降低并发测试间的时间抖动
+RESOURCE_LIMITS_ENABLED = False # 仅 POSIX: 为每个测试的进程树设置资源上限, 触及上限判为 FAIL_RESOURCE_LIMIT, 避免失控的提交拖慢其他并行测试
+LIMIT_AS_MB = None # 地址空间上限 (MB); JVM 启动时预留大量虚拟地址, 需配合 -Xmx 使用, 默认不限
+LIMIT_NPROC = None # 固定的进程/线程数上限; RLIMIT_NPROC 按用户统计, 需高于该用户其他进程与所有并行测试线程的总和. None 时按开始测试时该用户的线程数加余量计算
+LIMIT_NPROC_PER_TEST = 1024 # LIMIT_NPROC 为 None 时每个并行测试的线程余量
+LIMIT_CPU_SECONDS = 600 # CPU 时间上限 (秒), 超出时 JVM 收到 SIGXCPU, 5 秒后 SIGKILL
+LIMIT_NOFILE = 1024 # 打开文件数上限
+LIMIT_HIT_PATTERNS = {"nproc": ["unable to create native thread", "unable to create new native thread", "pthread_create failed"],
+                      "nofile": ["Too many open files"],
+                      "as": ["Could not reserve enough space", "Native memory allocation", "Cannot allocate memory", "insufficient memory for the Java Runtime"]} # 仅本机内存分配失败; Java heap space 等堆内 OOM 是程序自身的问题
+LEF_SCHEDULING_ENABLED = True # 估计每个测试的耗时, worker 空闲时从已生成的输入中取预计最长者 (而非按批次等待)
+SCHEDULE_STARTUP_SECONDS = 1.5; SCHEDULE_HISTORY_MIN_SAMPLES = 5 # 耗时估计中的 JVM 启动开销; 采用历史平均耗时所需的最少相近样本数
+INPUTS_DIRNAME = "inputs" # 输入生成阶段 (input_pipeline.py) 把输入写入结果目录下的该子目录, 最多领先执行 PIPELINE_BUFFER_SIZE 个
+CORPUS_SAVE_ENABLED = True # 每个测试的输入按内容哈希存入 BASE_DIR 下的语料库 (corpus.py), 失败的输入打上 failed 与失败状态标签
+CORPUS_SELECT = None # 非空时从语料库选取输入而不生成, 如 {"update_reqs": 3, "tags": ["failed"]} (参数见 InputCorpus.select; 未给出 mode/limit 时取所选测试模式与测试点数)
+FLAKY_RERUN_ENABLED = False # 测试结束后重跑每个失败签名类的代表输入, 统计复现率并标注 必现/偶发/负载敏感 (次数与时间上限见 flaky_rerun.py)
+OUTPUT_LINE_RE = re.compile(r"^\[\s*\d+\.\d+\s*\]")
 
 def print_color(text, color):
     if USE_COLOR:
@@ -38,98 +97,429 @@ def print_color(text, color):
     else:
         print(text)
 
+def input_profile(stdin_path):
+    """输入的时间概况: 最后一条请求时间, 剩余服务时间估计 (乘客行程按电梯数均摊, SCHE/UPDATE 按响应上限), 请求数"""
+    last_time = 0.0; passenger_work = 0.0; special_count = 0; request_count = 0
+    with open(stdin_path, "r", encoding='utf-8') as f:
+        for line in f:
+            ts_match = OUTPUT_LINE_RE.match(line.strip())
+            if not ts_match: continue
+            request_count += 1; last_time = max(last_time, float(line.strip()[1:ts_match.end() - 1]))
+            m_p = re.search(r"-FROM-([BF])(\d+)-TO-([BF])(\d+)", line)
+            if m_p:
+                from_fl = int(m_p.group(2)) * (-1 if m_p.group(1) == 'B' else 1); to_fl = int(m_p.group(4)) * (-1 if m_p.group(3) == 'B' else 1)
+                passenger_work += floor_distance(from_fl, to_fl) * MOVE_TIME_DEFAULT + TIMEOUT_DOOR_CYCLE_SECONDS
+            elif "SCHE-" in line or "UPDATE-" in line: special_count += 1
+    remaining_service = passenger_work / ELEVATOR_COUNT + special_count * TIMEOUT_SPECIAL_REQUEST_SECONDS / ELEVATOR_COUNT
+    return {"last_time": last_time, "service": remaining_service, "requests": request_count}
+
+def estimate_timeout(stdin_path, hard_cap_seconds):
+    """根据输入估计本测试超时: 最后一条请求时间 + 剩余服务时间估计的安全倍数"""
+    profile = input_profile(stdin_path)
+    estimate = profile["last_time"] + TIMEOUT_SAFETY_FACTOR * profile["service"] + TIMEOUT_BASE_SECONDS
+    return min(hard_cap_seconds, max(TIMEOUT_MIN_SECONDS, estimate))
+
+def estimate_duration(config, stdin_path, history=None):
+    """估计测试耗时: 最后请求时间 + 剩余服务时间 + 启动开销; 历史库中相近配置的通过测试足够多时, 与其平均实际耗时取平均"""
+    profile = input_profile(stdin_path)
+    estimate = profile["last_time"] + profile["service"] + SCHEDULE_STARTUP_SECONDS
+    if history is not None:
+        try: n, mean_runtime = history.similar_runtime(config)
+        except Exception: n, mean_runtime = 0, None
+        if n >= SCHEDULE_HISTORY_MIN_SAMPLES and mean_runtime: estimate = (estimate + mean_runtime) / 2
+    return estimate
+
+def make_duration_estimator(db_path=None):
+    """供输入生成线程使用的耗时估计函数; 历史库连接在该线程内首次调用时打开 (sqlite 连接不能跨线程使用)"""
+    state = {}
+    def estimate(config, stdin_path):
+        if db_path is not None and "store" not in state:
+            try: state["store"] = ResultStore(db_path)
+            except Exception: state["store"] = None
+        return estimate_duration(config, stdin_path, state.get("store"))
+    return estimate
+
+def simulate_makespan(durations, workers, batch_size=None):
+    """按给定顺序把测试分给最先空闲的 worker 时的总耗时; batch_size 非空时模拟按批次运行 (每批全部结束才开始下一批)"""
+    if batch_size:
+        return sum(max(durations[i:i + batch_size]) for i in range(0, len(durations), batch_size))
+    free_at = [0.0] * max(1, workers)
+    for d in durations: free_at.sort(); free_at[0] += d
+    return max(free_at)
+
+def _pump_stream(stream, capture_path, line_queue, tag):
+    """以二进制块读取管道并原样写入 capture_path, 同时把解码后的完整行连同接收时刻 (time.monotonic) 放入 (有界) 队列"""
+    pending = b""
+    try:
+        with open(capture_path, "wb") as capture:
+            while True:
+                chunk = stream.read1(CAPTURE_CHUNK_BYTES)
+                if not chunk: break
+                received = time.monotonic()
+                capture.write(chunk)
+                pending += chunk
+                *lines, pending = pending.split(b"\n")
+                if len(pending) > MAX_LINE_BYTES: lines.append(pending); pending = b"" # 超长无换行输出按行截断
+                for raw in lines: line_queue.put((tag, raw.decode('utf-8', errors='replace').rstrip("\r"), received))
+            if pending: line_queue.put((tag, pending.decode('utf-8', errors='replace').rstrip("\r"), time.monotonic()))
+    except (OSError, ValueError):
+        pass
+    finally:
+        line_queue.put((tag, None, None))
+
+class OutputLagTracker:
+    """输出延迟: 每行的接收时刻 (相对进程启动) 减去其打印的时间戳.
+    时间戳以 JVM 内输出包初始化为零点, 晚于进程启动, 因此以最小延迟作为启动偏移, 其余部分 (excess) 才是缓冲/阻塞造成的延迟"""
+    def __init__(self, start_monotonic):
+        self.start = start_monotonic; self.lags = []; self.dropped = 0
+
+    def add(self, line, received):
+        m = OUTPUT_LINE_RE.match(line)
+        if not m or received is None: return
+        if len(self.lags) >= OUTPUT_LAG_MAX_SAMPLES: self.dropped += 1; return
+        try: self.lags.append((received - self.start) - float(line[1:m.end() - 1]))
+        except ValueError: pass
+
+    def report(self):
+        if not self.lags: return None
+        offset = min(self.lags); excess = sorted(lag - offset for lag in self.lags)
+        d = {"lines": len(self.lags), "dropped": self.dropped, "startup_offset": offset, "mean": sum(excess) / len(excess), "max": excess[-1],
+             "over_threshold": sum(1 for x in excess if x > OUTPUT_LAG_WARN_SECONDS)}
+        for q in LATENCY_PERCENTILES: d[f"p{int(round(q * 100))}"] = excess[min(len(excess) - 1, int(math.ceil(q * len(excess))) - 1)]
+        return d
+
+def iter_capture_lines(capture_path):
+    """逐行读取落盘的输出"""
+    with open(capture_path, "r", encoding='utf-8', errors='replace') as f:
+        for line in f: yield line.rstrip("\r\n")
+
+def monitor_process(process, stdin_path, timeout_seconds, start_time, capture_dir):
+    """读取进程输出直至其结束、超时或被看门狗判定死锁; 后两种情况下先抓取线程转储, 再终止整个进程组并收集残余输出.
+    stdout/stderr 完整写入 capture_dir, 内存中只保留尾部; stdout 同时送入流式验证器.
+    返回 dict: outcome (EXITED / TIMEOUT / DEADLOCK), validator (流式验证器, 出错时为 None), stdout_path, stderr_path,
+    stdout_tail, stdout_line_count, stderr (尾部), detail, thread_dump"""
+    stdout_path = capture_dir / STDOUT_CAPTURE_FILENAME; stderr_path = capture_dir / STDERR_CAPTURE_FILENAME
+    lag_tracker = OutputLagTracker(time.monotonic()) # 紧随 Popen 之后取零点
+    line_queue = queue.Queue(maxsize=LINE_QUEUE_MAX)
+    readers = [threading.Thread(target=_pump_stream, args=(process.stdout, stdout_path, line_queue, 'out'), daemon=True),
+               threading.Thread(target=_pump_stream, args=(process.stderr, stderr_path, line_queue, 'err'), daemon=True)]
+    for reader in readers: reader.start()
+
+    live_validator = None
+    try:
+        live_validator = OutputValidator(stdin_path)
+        if not live_validator.begin_stream(): live_validator = None
+    except Exception:
+        live_validator = None
+
+    stdout_tail = deque(maxlen=STDOUT_TAIL_LINES); stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+    stdout_line_count = 0; open_streams = len(readers)
+    last_output_time = start_time; outcome = "EXITED"; detail = ""
+
+    def consume(tag, line, received=None):
+        nonlocal last_output_time, live_validator, stdout_line_count
+        if tag == 'err': stderr_tail.append(line); return
+        stdout_tail.append(line); stdout_line_count += 1; last_output_time = time.time(); lag_tracker.add(line, received)
+        if live_validator is not None:
+            try: live_validator.feed_line(line)
+            except Exception: live_validator = None # 流式状态不可信, 之后从落盘输出重新验证
+
+    while open_streams > 0:
+        now = time.time()
+        if now - start_time > timeout_seconds: outcome = "TIMEOUT"; break
+        if WATCHDOG_ENABLED and live_validator is not None:
+            quiet_since = max(last_output_time, start_time + live_validator.last_request_time)
+            if now - quiet_since >= DEADLOCK_QUIET_SECONDS:
+                stalled, detail = live_validator.stall_state()
+                if stalled: outcome = "DEADLOCK"; break
+        try: tag, line, received = line_queue.get(timeout=WATCHDOG_POLL_SECONDS)
+        except queue.Empty: continue
+        if line is None: open_streams -= 1
+        else: consume(tag, line, received)
+
+    run_info = {"outcome": outcome, "stdout_path": stdout_path, "stderr_path": stderr_path, "detail": detail, "thread_dump": ""}
+    if outcome == "EXITED":
+        process.wait()
+    else:
+        if THREAD_DUMP_ENABLED:
+            run_info["thread_dump"] = capture_thread_dump(process, line_queue, consume)
+        if kill_process_tree(process):
+            print_color(f"  信息: 进程组未响应终止信号，已强制结束。", Fore.CYAN)
+        deadline = time.time() + 1.0
+        while open_streams > 0 and time.time() < deadline:
+            try: tag, line, received = line_queue.get(timeout=0.1)
+            except queue.Empty: continue
+            if line is None: open_streams -= 1
+            else: consume(tag, line, received)
+        if open_streams > 0:
+            print_color(f"  信息: 获取残余输出超时 (1s)，可能进程未能完全终止。", Fore.CYAN)
+    run_info.update({"validator": live_validator, "stdout_tail": list(stdout_tail), "stdout_line_count": stdout_line_count,
+                     "stderr": "\n".join(stderr_tail), "output_lag": lag_tracker.report()})
+    return run_info
+
+def capture_thread_dump(process, line_queue, consume):
+    """向挂起的 JVM 请求线程转储. SIGQUIT 的转储写在 stdout 上: 转储期间符合输出格式的行仍交给 consume, 其余行归入转储"""
+    dump_parts = []
+    try:
+        java_pids = find_java_pids(process)
+        if not java_pids: return ""
+        for pid in java_pids:
+            direct = request_thread_dump(pid)
+            if direct: dump_parts.append(direct)
+    except OSError as e_dump:
+        return f"请求线程转储失败: {e_dump}"
+    if os.name == 'nt': return "\n".join(dump_parts)
+    deadline = time.time() + THREAD_DUMP_WAIT_SECONDS; last_dump_line_time = None
+    while time.time() < deadline:
+        if last_dump_line_time is not None and time.time() - last_dump_line_time > 0.5: break
+        try: tag, line, received = line_queue.get(timeout=0.1)
+        except queue.Empty: continue
+        if line is None: continue
+        if tag == 'out' and not OUTPUT_LINE_RE.match(line):
+            dump_parts.append(line); last_dump_line_time = time.time()
+        else: consume(tag, line, received)
+    return "\n".join(dump_parts)
+
+def make_test_config(test_mode):
+    """随机生成一个测试配置 (请求数量与数据生成种子)"""
+    config = {'type': test_mode, 'seed': random.randrange(2**31)}
+    if test_mode == 'public':
+        config['passenger_reqs'] = random.randint(85, 100)
+        config['sche_reqs'] = random.randint(3, MAX_SCHE_REQUESTS_PUBLIC)
+        config['update_reqs'] = random.choice([2, 3])
+        config['update_reqs'] = min(config['update_reqs'], MAX_UPDATE_REQUESTS)
+    else:
+        p_req = random.randint(50, 65)
+        u_req = random.randint(1, min(MAX_UPDATE_REQUESTS, 3))
+        s_req = min(random.randint(1, 3), MAX_TOTAL_REQUESTS_MUTUAL - p_req - u_req, ELEVATOR_COUNT - u_req*2)
+        s_req = max(0, s_req)
+        p_req = max(1, MAX_TOTAL_REQUESTS_MUTUAL - u_req - s_req)
+        config['passenger_reqs'] = p_req; config['sche_reqs'] = s_req; config['update_reqs'] = u_req;
+    return config
+
+def generate_input(config, path):
+    """按配置 (含 seed) 生成输入文件, 成功返回 True. 使用独立的 random.Random(seed), 不影响全局随机状态 (生成阶段在后台线程中运行)"""
+    rng = random.Random(config['seed']) if config.get('seed') is not None else random.Random()
+    return generate_requests_phased_hw7(num_passenger_requests=config['passenger_reqs'], num_sche_requests=config['sche_reqs'],
+                                        num_update_requests=config['update_reqs'], filename=path, is_mutual_test=(config['type'] == 'mutual'), rng=rng)
+
+def prepare_input(config, path):
+    """准备输入文件: 配置含 corpus_sha 时从语料库复制, 否则按配置生成"""
+    if config.get('corpus_sha'):
+        shutil.copy2(corpus_path(BASE_DIR / CORPUS_DIRNAME, config['corpus_sha']), path); return True
+    return generate_input(config, path)
+
+def write_test_report(results_path, test_index, test_type, report):
+    """写入单个测试的分析报告 (results/reports/report_<idx>_<type>.json)"""
+    reports_dir = pathlib.Path(results_path) / REPORTS_DIRNAME
+    try:
+        reports_dir.mkdir(exist_ok=True)
+        with open(reports_dir / f"report_{test_index}_{test_type}.json", "w", encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1, default=str)
+    except (OSError, TypeError, ValueError) as e_report:
+        print_color(f"  [T{test_index}] 警告: 写入测试报告失败: {e_report}", Fore.YELLOW)
+
+def compact_utilisation(utilisation):
+    """去掉时间窗明细的利用率统计 (随结果返回主进程用于汇总)"""
+    if not utilisation: return None
+    return {"summary": utilisation["summary"],
+            "elevators": {eid: {k: v for k, v in d.items() if k != "windows"} for eid, d in utilisation["elevators"].items()}}
+
+def compact_latency(latency, validator):
+    """随结果返回的延迟数据: 饥饿人数与每名已送达乘客的 (优先级段, 等待, 乘坐, 总计) 样本"""
+    if not latency or validator is None: return None
+    samples = []
+    for p in validator.passengers.values():
+        wait, ride, total = p.latency()
+        if total is None: continue
+        band = next((f"{lo}-{hi}" for lo, hi in PRIORITY_BANDS if lo <= p.priority <= hi), "?")
+        samples.append((band, wait, ride, total))
+    return {"starved": len(latency["starved"]), "transfers": latency["transfers"], "out_f": latency["out_f"], "samples": samples}
+
+def nproc_limit(max_workers):
+    """开始一组测试时确定 RLIMIT_NPROC: 固定的 LIMIT_NPROC, 或当前用户线程数 + 每个并行测试 LIMIT_NPROC_PER_TEST 的余量.
+    已有的系统上限余量不足时给出警告 (此时 JVM 可能因该用户的其他程序而无法创建线程, 并非提交本身的问题)"""
+    if not RESOURCE_LIMITS_ENABLED or resource is None or not hasattr(resource, "RLIMIT_NPROC"): return None
+    current = count_user_threads()
+    limit = LIMIT_NPROC or (current + LIMIT_NPROC_PER_TEST * max_workers if current is not None else None)
+    soft, _ = resource.getrlimit(resource.RLIMIT_NPROC)
+    caps = [x for x in (limit, None if soft == resource.RLIM_INFINITY else soft) if x]; effective = min(caps) if caps else None
+    if current is not None and effective is not None and effective - current < LIMIT_NPROC_PER_TEST * max_workers:
+        print_color(f"警告: 当前用户已有 {current} 个线程, 进程/线程数上限 {effective} 仅余 {max(0, effective - current)} "
+                    f"(建议每个并行测试 {LIMIT_NPROC_PER_TEST}); 线程创建失败将被判为 FAIL_RESOURCE_LIMIT, 请调高上限或减少 MAX_WORKERS.", Fore.YELLOW)
+    return limit
+
+def resource_limits():
+    """本测试进程树的资源上限 {RLIMIT_*: (soft, hard)}; 未启用或非 POSIX 时为空"""
+    if not RESOURCE_LIMITS_ENABLED or resource is None: return {}
+    limits = {}
+    if LIMIT_AS_MB: limits[resource.RLIMIT_AS] = (LIMIT_AS_MB << 20, LIMIT_AS_MB << 20)
+    if _nproc_limit and hasattr(resource, "RLIMIT_NPROC"): limits[resource.RLIMIT_NPROC] = (_nproc_limit, _nproc_limit)
+    if LIMIT_CPU_SECONDS: limits[resource.RLIMIT_CPU] = (LIMIT_CPU_SECONDS, LIMIT_CPU_SECONDS + 5)
+    if LIMIT_NOFILE: limits[resource.RLIMIT_NOFILE] = (LIMIT_NOFILE, LIMIT_NOFILE)
+    return limits
+
+def detect_limit_hit(exit_code, output_text, cpu_seconds):
+    """根据退出码 (被 SIGXCPU/SIGKILL 终止) 与 stderr/stdout 中的 JVM 错误判断是否触及资源上限, 返回 (上限名, 依据) 或 None"""
+    if not RESOURCE_LIMITS_ENABLED or resource is None: return None
+    sigxcpu = getattr(signal, "SIGXCPU", None)
+    if LIMIT_CPU_SECONDS and exit_code is not None:
+        if sigxcpu and exit_code in (128 + sigxcpu, -sigxcpu): return "cpu", f"进程被 SIGXCPU 终止 (上限 {LIMIT_CPU_SECONDS}s)"
+        if exit_code in (128 + signal.SIGKILL, -signal.SIGKILL) and cpu_seconds is not None and cpu_seconds >= LIMIT_CPU_SECONDS:
+            return "cpu", f"CPU 时间 {cpu_seconds:.1f}s 达到上限后被 SIGKILL 终止"
+    configured = {"nproc": _nproc_limit, "nofile": LIMIT_NOFILE, "as": LIMIT_AS_MB} # nproc 取本组测试实际设置的上限
+    for name, patterns in LIMIT_HIT_PATTERNS.items():
+        if not configured[name]: continue
+        for pattern in patterns:
+            if pattern in output_text:
+                line = next(l for l in output_text.splitlines() if pattern in l)
+                return name, line.strip()[:200]
+    return None
+
+def children_cpu_times():
+    """已回收子进程的累计 (user, sys) CPU 时间; 非 POSIX 返回 None"""
+    if resource is None: return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime, usage.ru_stime
+
+_core_queue = None # 工作进程内: 空闲核心组队列 (由 make_test_executor 的 initializer 设置)
+_nproc_limit = None # 工作进程内: 本组测试的 RLIMIT_NPROC (由 make_test_executor 的 initializer 设置)
+
+def _init_worker(core_queue, nproc):
+    global _core_queue, _nproc_limit
+    _core_queue = core_queue; _nproc_limit = nproc
+
+def acquire_cores():
+    """取得一个空闲核心组; 未启用绑核或取不到时返回 None"""
+    if _core_queue is None: return None
+    try: return _core_queue.get(timeout=5.0)
+    except queue.Empty: return None
+
+def release_cores(cores):
+    if cores is not None and _core_queue is not None: _core_queue.put(cores)
+
+def make_test_executor(max_workers):
+    """创建运行测试的进程池; CORE_PINNING_ENABLED 时预先划分 max_workers 个互不相交的核心组 (避开负载注入占用的核心), 测试运行期间独占其一;
+    RESOURCE_LIMITS_ENABLED 时在此确定本组测试的线程数上限"""
+    core_queue = None; nproc = nproc_limit(max_workers)
+    if CORE_PINNING_ENABLED and os.name != 'nt':
+        exclude = parse_cores(LOAD_CORES) if LOAD_INJECTION_ENABLED else None
+        core_sets = allocate_core_sets(max_workers, CORES_PER_TEST, exclude)
+        if core_sets:
+            core_queue = multiprocessing.Queue()
+            for cores in core_sets: core_queue.put(cores)
+        else: print_color(f"警告: 可用核心不足以为 {max_workers} 个并行测试各分配 1 个核心, 不绑核运行.", Fore.YELLOW)
+    if core_queue is None and nproc is None: return concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+    return concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(core_queue, nproc))
+
 def run_single_test_parallel_subdir(test_index, test_config, base_path, results_path):
-    status_code = "UNKNOWN"; performance_data = None; validation_errors = []
-    stdout_lines = []; stderr_output = ""; real_time_taken = 0; java_exit_code = -1
+    """运行单个测试. test_config 可选键: stdin_file (使用已有输入而不生成), jar_file (替代 code.jar),
+    save_artifacts (失败时是否写入 failed_data/failed_stdout, 默认 True), seed (数据生成的随机种子)"""
+    status_code = "UNKNOWN"; performance_data = None; baseline_data = None; bounds_data = None; utilisation_data = None; latency_data = None; special_data = None; timing_data = None; output_lag_data = None; report_validator = None; validation_errors = []; cpu_user = cpu_sys = None; cores = None; limit_hit = None
+    stdout_tail = []; stderr_output = ""; real_time_taken = 0; java_exit_code = -1
+    thread_dump_text = ""; thread_dump_summary = []; live_validator = None
     test_type = test_config['type']
     timeout_seconds = TIMEOUT_SECONDS_MUTUAL if test_type == 'mutual' else TIMEOUT_SECONDS_PUBLIC
     timed_out = False
     test_subdir_path = base_path / f"{TEST_SUBDIR_PREFIX}{test_index}_{test_type}"
+    stdout_capture_path = test_subdir_path / STDOUT_CAPTURE_FILENAME
     final_status = "UNKNOWN"
 
     try:
         test_subdir_path.mkdir(exist_ok=True)
-        required_files = [DATAPUT_EXE, JAR_FILE, OFFICIAL_JAR_FILE]
-        for f in required_files:
+        code_jar = pathlib.Path(test_config.get('jar_file', JAR_FILE))
+        required_files = [(DATAPUT_EXE, DATAPUT_EXE.name), (code_jar, JAR_FILE.name), (OFFICIAL_JAR_FILE, OFFICIAL_JAR_FILE.name)]
+        for f, local_name in required_files:
             if f.exists():
-                shutil.copy2(f, test_subdir_path / f.name)
+                shutil.copy2(f, test_subdir_path / local_name)
             else:
                 raise FileNotFoundError(f"必需文件未找到: {f}")
 
         local_stdin_path = test_subdir_path / STDIN_FILENAME
-        print(f"[测试 {test_index} ({test_type})] 生成数据 ({test_config['passenger_reqs']} P, {test_config['sche_reqs']} S, {test_config['update_reqs']} U)...")
-        if not generate_requests_phased_hw7(
-            num_passenger_requests=test_config['passenger_reqs'],
-            num_sche_requests=test_config['sche_reqs'],
-            num_update_requests=test_config['update_reqs'],
-            filename=local_stdin_path, is_mutual_test=(test_type == 'mutual')
-        ):
-            status_code = "FAIL_GENERATE"
-            raise RuntimeError("数据生成失败.")
+        if test_config.get('stdin_file'):
+            print(f"[测试 {test_index} ({test_type})] 使用已有输入 {pathlib.Path(test_config['stdin_file']).name}...")
+            shutil.copyfile(test_config['stdin_file'], local_stdin_path)
+        else:
+            print(f"[测试 {test_index} ({test_type})] 生成数据 ({test_config['passenger_reqs']} P, {test_config['sche_reqs']} S, {test_config['update_reqs']} U)...")
+            if not prepare_input(test_config, local_stdin_path):
+                status_code = "FAIL_GENERATE"
+                raise RuntimeError("数据生成失败.")
+
+        if ADAPTIVE_TIMEOUT_ENABLED:
+            timeout_seconds = estimate_timeout(local_stdin_path, timeout_seconds)
 
         classpath_sep = ";" if os.name == 'nt' else ":"
         classpath = f'"{JAR_FILE.name}"{classpath_sep}"{OFFICIAL_JAR_FILE.name}"'
-        cmd = f'.\\{DATAPUT_EXE.name} | {JAVA_COMMAND} -cp {classpath} {MAIN_CLASS_NAME}'
+        exe_prefix = ".\\" if os.name == 'nt' else "./"
+        java_opts = "-XX:+PrintConcurrentLocks " if THREAD_DUMP_ENABLED else "" # 使转储包含 ReentrantLock 等持有信息
+        cmd = f'{exe_prefix}{DATAPUT_EXE.name} | {JAVA_COMMAND} {java_opts}-cp {classpath} {MAIN_CLASS_NAME}'
 
-        print(f"[测试 {test_index} ({test_type})] 执行程序 (超时: {timeout_seconds}s)...")
-        start_time = time.time()
+        print(f"[测试 {test_index} ({test_type})] 执行程序 (超时: {timeout_seconds:.0f}s)...")
+        cores = acquire_cores()
+        start_time = time.time(); cpu_before = children_cpu_times()
         process = None
-        stdout = None
-        stderr = None
         try:
             process = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                                       text=True, encoding='utf-8', errors='replace', cwd=test_subdir_path)
-            stdout, stderr = process.communicate(timeout=timeout_seconds)
+                                       cwd=test_subdir_path, **popen_group_kwargs(cores, resource_limits()))
+            run_info = monitor_process(process, local_stdin_path, timeout_seconds, start_time, test_subdir_path)
+            outcome = run_info["outcome"]; stdout_tail = run_info["stdout_tail"]; stderr_output = run_info["stderr"]
+            watchdog_detail = run_info["detail"]; thread_dump_text = run_info["thread_dump"]; live_validator = run_info["validator"]
+            output_lag_data = run_info["output_lag"]
+            if output_lag_data and output_lag_data["p99"] > OUTPUT_LAG_WARN_SECONDS:
+                print_color(f"  [T{test_index}] 警告: 输出延迟 p99 {output_lag_data['p99'] * 1000:.0f}ms, 最大 {output_lag_data['max'] * 1000:.0f}ms "
+                            f"({output_lag_data['over_threshold']} 行超过 {OUTPUT_LAG_WARN_SECONDS * 1000:.0f}ms), 可能存在输出阻塞或锁竞争", Fore.YELLOW)
             end_time = time.time()
             real_time_taken = end_time - start_time
-            stdout_lines = stdout.splitlines() if stdout else []
-            stderr_output = stderr if stderr else ""
-            java_exit_code = process.returncode
-            print(f"[测试 {test_index} ({test_type})] 执行完成于 {real_time_taken:.2f}s (Java 退出码: {java_exit_code}).")
-            if stderr_output.strip():
-                status_code = "FAIL_STDERR_OUTPUT"
-            elif java_exit_code != 0:
-                 status_code = "FAIL_JAVA_ERROR"
+            cpu_after = children_cpu_times()
+            if cpu_before is not None: cpu_user = cpu_after[0] - cpu_before[0]; cpu_sys = cpu_after[1] - cpu_before[1]
+            if outcome == "EXITED":
+                java_exit_code = process.returncode
+                print(f"[测试 {test_index} ({test_type})] 执行完成于 {real_time_taken:.2f}s (Java 退出码: {java_exit_code}).")
+                if stderr_output.strip():
+                    status_code = "FAIL_STDERR_OUTPUT"
+                elif java_exit_code != 0:
+                     status_code = "FAIL_JAVA_ERROR"
+                else:
+                    status_code = "EXECUTION_COMPLETE"
             else:
-                status_code = "EXECUTION_COMPLETE"
-        except subprocess.TimeoutExpired:
-            end_time = time.time()
-            real_time_taken = end_time - start_time
-            print_color(f"[测试 {test_index} ({test_type})] 错误: 进程超时 {timeout_seconds}s.", Fore.RED)
-            timed_out = True
-            status_code = "EXECUTION_TIMED_OUT"
-            if process:
-                process.kill()
-                stdout_after_kill = None
-                stderr_after_kill = None
-                try:
-                    stdout_after_kill, stderr_after_kill = process.communicate(timeout=1)
-                except subprocess.TimeoutExpired:
-                    print_color(f"  [T{test_index}] 信息: 获取残余输出超时 (1s)，可能进程未能完全终止。", Fore.CYAN)
-                except Exception as e_comm_kill:
-                    print_color(f"  [T{test_index}] 警告: kill 后 communicate 出错: {e_comm_kill}", Fore.YELLOW)
-                    stderr_output += f"\n--- Error in communicate after kill: {e_comm_kill} ---"
-
-                if stdout_after_kill is not None:
-                     stdout_lines = stdout_after_kill.splitlines()
-                if stderr_after_kill is not None:
-                     stderr_output = stderr_after_kill
+                if outcome == "DEADLOCK":
+                    print_color(f"[测试 {test_index} ({test_type})] 错误: 输出停滞 {DEADLOCK_QUIET_SECONDS}s, 判定死锁 ({watchdog_detail}).", Fore.RED)
+                    status_code = "EXECUTION_DEADLOCK"
+                    validation_errors.append(f"看门狗: 输出停滞 {DEADLOCK_QUIET_SECONDS}s 于 {real_time_taken:.2f}s 判定死锁 - {watchdog_detail}")
+                else:
+                    print_color(f"[测试 {test_index} ({test_type})] 错误: 进程超时 {timeout_seconds:.0f}s.", Fore.RED)
+                    timed_out = True
+                    status_code = "EXECUTION_TIMED_OUT"
+                if THREAD_DUMP_ENABLED:
+                    thread_dump_summary = summarize_thread_dump(thread_dump_text)
+                    for summary_line in thread_dump_summary: print_color(f"  [T{test_index}] 线程转储: {summary_line}", Fore.CYAN)
+            limit_hit = detect_limit_hit(process.returncode, stderr_output + "\n" + "\n".join(stdout_tail),
+                                         cpu_user + cpu_sys if cpu_user is not None else None)
+            if limit_hit:
+                print_color(f"[测试 {test_index} ({test_type})] 错误: 触及资源上限 {limit_hit[0]}: {limit_hit[1]}", Fore.RED)
+                status_code = "FAIL_RESOURCE_LIMIT"; validation_errors.append(f"资源上限 ({limit_hit[0]}): {limit_hit[1]}")
         except Exception as e_exec:
             end_time = time.time()
             real_time_taken = end_time - start_time
             print_color(f"[测试 {test_index} ({test_type})] 执行期间出错: {e_exec}", Fore.RED)
             if process:
-                process.kill()
+                kill_process_tree(process)
             status_code = "FAIL_RUNTIME"
             stderr_output += f"\n--- Python 执行错误 ---\n{e_exec}"
+        finally:
+            release_cores(cores)
 
         validation_success = False
         first_validation_errors = []
-        if status_code != "FAIL_STDERR_OUTPUT":
+        if status_code not in ("FAIL_STDERR_OUTPUT", "FAIL_RESOURCE_LIMIT"):
             print(f"[测试 {test_index} ({test_type})] 第一次验证输出...")
             try:
-                validator = OutputValidator(local_stdin_path)
-                validation_success = validator.validate_output(stdout_lines)
+                if live_validator is not None:
+                    validator = live_validator; report_validator = validator
+                    validation_success = validator.finish_stream()
+                else:
+                    validator = OutputValidator(local_stdin_path); report_validator = validator
+                    validation_success = validator.validate_output(iter_capture_lines(stdout_capture_path) if stdout_capture_path.exists() else [])
                 first_validation_errors.extend(validator.errors)
                 validation_errors.extend(first_validation_errors)
             except Exception as e_val:
@@ -137,6 +527,8 @@ def run_single_test_parallel_subdir(test_index, test_config, base_path, results_
                  err_msg = f"第一次验证崩溃: {e_val}\n{traceback.format_exc()}"
                  validation_errors.append(err_msg)
                  first_validation_errors.append(err_msg)
+        elif status_code == "FAIL_RESOURCE_LIMIT":
+            first_validation_errors = validation_errors[:]
         else:
             validation_errors = ["Stderr 非空，跳过验证。"]
             first_validation_errors = validation_errors[:]
@@ -144,6 +536,8 @@ def run_single_test_parallel_subdir(test_index, test_config, base_path, results_
         initial_status = "UNKNOWN"
         if status_code == "EXECUTION_TIMED_OUT":
             initial_status = "FAIL_TIMEOUT"
+        elif status_code == "EXECUTION_DEADLOCK":
+            initial_status = "FAIL_DEADLOCK"
         elif validation_success and status_code == "EXECUTION_COMPLETE":
             initial_status = "PASS"
         else:
@@ -160,13 +554,19 @@ def run_single_test_parallel_subdir(test_index, test_config, base_path, results_
         if initial_status == "PASS" and not timed_out:
             print(f"[测试 {test_index} ({test_type})] 重新验证以计算性能...")
             try:
-                perf_validator = OutputValidator(local_stdin_path)
-                revalidation_success = perf_validator.validate_output(stdout_lines)
+                perf_validator = OutputValidator(local_stdin_path); report_validator = perf_validator
+                revalidation_success = perf_validator.validate_output(iter_capture_lines(stdout_capture_path))
                 revalidation_errors = perf_validator.errors
 
                 if revalidation_success:
                     print(f"[测试 {test_index} ({test_type})] 重新验证成功，计算性能...")
                     performance_data = perf_validator.calculate_performance(real_time_taken)
+                    if PERF_BOUNDS_ENABLED:
+                        try: bounds_data = bounds_for_input(local_stdin_path)
+                        except Exception as e_bound: print_color(f"  [T{test_index}] 警告: 下界计算失败: {e_bound}", Fore.YELLOW)
+                    if BASELINE_SIM_ENABLED:
+                        try: baseline_data = simulate_all(local_stdin_path)
+                        except Exception as e_sim: print_color(f"  [T{test_index}] 警告: 基线模拟失败: {e_sim}", Fore.YELLOW)
                 else:
                     print_color(f"  [T{test_index}] 警告: 性能计算前重新验证失败。", Fore.YELLOW)
                     final_status = "FAIL_VALIDATE_RECHECK" # 更新最终状态
@@ -182,8 +582,34 @@ def run_single_test_parallel_subdir(test_index, test_config, base_path, results_
                 validation_errors.append(f"计算性能时出错: {e_perf}\n{traceback.format_exc()}")
 
         print_color(f"[测试 {test_index} ({test_type})] 最终结果: {final_status}", Fore.GREEN if final_status == "PASS" else Fore.RED)
+        if final_status != "PASS" and stdout_tail:
+            print(f"  [T{test_index}] STDOUT 末尾 {min(len(stdout_tail), 5)} 行:")
+            for tail_line in stdout_tail[-5:]: print(f"    {tail_line[:200]}")
+
+        if report_validator is not None:
+            try:
+                utilisation_data = report_validator.utilisation_report(); latency_data = report_validator.latency_report()
+                special_data = report_validator.special_report(); timing_data = report_validator.timing_report()
+            except Exception as e_util: print_color(f"  [T{test_index}] 警告: 利用率/延迟统计失败: {e_util}", Fore.YELLOW)
+            for check, hist in (timing_data or {}).items():
+                if hist["n"] and hist["min"] < TIMING_SLACK_WARN_SECONDS:
+                    print_color(f"  [T{test_index}] 警告: {check} 最小时间余量 {hist['min'] * 1000:+.1f}ms ({hist['counts'][0]} 次低于最小允许时间, 依赖判定容差)", Fore.YELLOW)
+            if special_data:
+                for record in special_data["records"]:
+                    if record["margin"] is not None and record["margin"] < SPECIAL_MARGIN_WARN_SECONDS:
+                        print_color(f"  [T{test_index}] 警告: {record['kind']} {'-'.join(f'E{e}' for e in record['elevators'])} 响应 {record['response']:.3f}s, "
+                                    f"距 6s 上限仅余 {record['margin']:.3f}s", Fore.YELLOW)
+            if latency_data and latency_data["starved"] and final_status == "PASS":
+                worst = latency_data["starved"][0]
+                print_color(f"  [T{test_index}] 饥饿乘客 {len(latency_data['starved'])} 名 (>{latency_data['threshold']:.0f}s), 最久 P{worst['id']} "
+                            f"(优先级 {worst['priority']}): {worst['total']:.2f}s", Fore.YELLOW)
+        if test_config.get('save_artifacts', True):
+            write_test_report(results_path, test_index, test_type, {
+                "index": test_index, "type": test_type, "status": final_status, "seed": test_config.get('seed'),
+                "real_time": real_time_taken, "performance": performance_data, "baseline": baseline_data, "bounds": bounds_data,
+                "utilisation": utilisation_data, "latency": latency_data, "special": special_data, "timing": timing_data, "output_lag": output_lag_data})
 
-        if final_status != "PASS":
+        if final_status != "PASS" and test_config.get('save_artifacts', True):
              failed_data_filename = results_path / f"failed_data_{test_index}_{test_type}.txt"
              failed_stdout_filename = results_path / f"failed_stdout_{test_index}_{test_type}.txt"
              try:
@@ -197,9 +623,13 @@ def run_single_test_parallel_subdir(test_index, test_config, base_path, results_
                       try:
                           with open(local_stdin_path, "r", encoding='utf-8') as sf: f.write(sf.read())
                       except Exception as e_read_stdin: f.write(f"读取 stdin 失败: {e_read_stdin}\n")
-                      f.write("\n\n--- STDOUT (可能部分) ---\n"); f.write("\n".join(stdout_lines))
-                      f.write("\n\n--- STDERR ---\n"); f.write(stderr_output)
+                      f.write("\n\n--- STDOUT (可能部分) ---\n")
+                      if stdout_capture_path.exists():
+                          with open(stdout_capture_path, "r", encoding='utf-8', errors='replace') as cf: shutil.copyfileobj(cf, f)
+                      f.write(f"\n\n--- STDERR (末尾 {STDERR_TAIL_LINES} 行) ---\n"); f.write(stderr_output)
                       if validation_errors: f.write("\n\n--- Validation Errors ---\n"); f.write("\n".join(validation_errors))
+                      if thread_dump_summary: f.write("\n\n--- THREAD DUMP SUMMARY ---\n"); f.write("\n".join(thread_dump_summary))
+                      if thread_dump_text: f.write("\n\n--- THREAD DUMP ---\n"); f.write(thread_dump_text)
              except IOError as e_write: print_color(f"  [T{test_index}] 警告: 写入失败日志失败: {e_write}", Fore.YELLOW)
 
     except Exception as e_outer:
@@ -213,7 +643,29 @@ def run_single_test_parallel_subdir(test_index, test_config, base_path, results_
         except Exception as e_clean: print_color(f"[测试 {test_index}] 警告: 清理子目录失败: {e_clean}", Fore.YELLOW)
 
     return {"index": test_index, "type": test_type, "status": final_status, "performance": performance_data,
-            "errors": validation_errors, "stderr": stderr_output, "real_time_taken": real_time_taken}
+            "errors": validation_errors, "stderr": stderr_output, "real_time_taken": real_time_taken,
+            "thread_dump_summary": thread_dump_summary, "timeout_seconds": timeout_seconds,
+            "seed": test_config.get('seed'), "cpu_user": cpu_user, "cpu_sys": cpu_sys, "baseline": baseline_data, "bounds": bounds_data,
+            "utilisation": compact_utilisation(utilisation_data), "latency": compact_latency(latency_data, report_validator),
+            "special": [{k: r[k] for k in ["kind"] + SPECIAL_STAGES} for r in special_data["records"]] if special_data else None,
+            "timing": timing_data, "output_lag": output_lag_data, "cores": cores,
+            "limit_hit": limit_hit[0] if limit_hit else None}
+
+def run_tests_parallel(jobs, results_path, max_workers=MAX_WORKERS, on_result=None):
+    """并行运行 [(test_index, test_config)], 返回按提交顺序排列的结果列表; on_result 在每个测试完成时被调用"""
+    results = [None] * len(jobs)
+    with make_test_executor(max_workers) as executor:
+        future_to_pos = {executor.submit(run_single_test_parallel_subdir, idx, cfg, BASE_DIR, results_path): pos
+                         for pos, (idx, cfg) in enumerate(jobs)}
+        for future in concurrent.futures.as_completed(future_to_pos):
+            pos = future_to_pos[future]; idx, cfg = jobs[pos]
+            try: result = future.result()
+            except Exception as e_future:
+                result = {"index": idx, "type": cfg['type'], "status": "FAIL_FUTURE_ERROR", "performance": None,
+                          "errors": [f"Future Error: {e_future}\n{traceback.format_exc()}"], "stderr": "", "real_time_taken": -1}
+            results[pos] = result
+            if on_result: on_result(result)
+    return results
 
 if __name__ == "__main__":
     test_mode_choice = ""; test_mode = ""
@@ -231,10 +683,10 @@ if __name__ == "__main__":
     total_test_cases = 0
     while True:
         try:
-            num_input = input(f"请输入要运行的 {test_mode.capitalize()} 测试点数量 (必须是 {MAX_WORKERS} 的倍数): ")
+            num_input = input(f"请输入要运行的 {test_mode.capitalize()} 测试点数量: ")
             total_test_cases = int(num_input)
-            if total_test_cases > 0 and total_test_cases % MAX_WORKERS == 0: break
-            else: print_color(f"输入必须是大于 0 且是 {MAX_WORKERS} 的倍数。", Fore.RED)
+            if total_test_cases > 0: break
+            else: print_color("输入必须是大于 0 的整数。", Fore.RED)
         except ValueError: print_color("请输入一个整数。", Fore.RED)
 
     results_dir_path = BASE_DIR / RESULTS_DIR_NAME
@@ -246,49 +698,104 @@ if __name__ == "__main__":
     if not all(f.exists() for f in essential_files): print_color(f"错误: 缺少必需文件. 中止测试。", Fore.RED); sys.exit(1)
 
     overall_start_time = time.time(); all_results = []; tests_completed_count = 0
+    campaign_stats = CampaignStats()
+    history = None; campaign_id = None; injector = None
+    if LOAD_INJECTION_ENABLED:
+        injector = LoadInjector(LOAD_PROCESSES, LOAD_DUTY_CYCLE, parse_cores(LOAD_CORES), LOAD_MEMORY_MB)
+        print_color(f"负载注入已启用: {injector.label()}", Fore.YELLOW)
+    if HISTORY_DB_ENABLED:
+        try:
+            history = ResultStore(BASE_DIR / DB_FILENAME); campaign_id = history.start_campaign(test_mode, JAR_FILE, total_test_cases, injector.label() if injector else None)
+        except Exception as e_db: print_color(f"警告: 无法打开历史库 {DB_FILENAME}: {e_db}", Fore.YELLOW); history = None
+
+    corpus = None
+    if CORPUS_SAVE_ENABLED or CORPUS_SELECT:
+        try: corpus = InputCorpus(BASE_DIR / CORPUS_DIRNAME)
+        except Exception as e_corpus: print_color(f"警告: 无法打开输入语料库 {CORPUS_DIRNAME}: {e_corpus}", Fore.YELLOW)
 
     test_configs_to_run = []
-    print(f"\n准备 {total_test_cases} 个 {test_mode.capitalize()} HW7 测试配置...")
-    for i in range(total_test_cases):
-        config = {'type': test_mode}
-        if test_mode == 'public':
-            config['passenger_reqs'] = random.randint(85, 100)
-            config['sche_reqs'] = random.randint(3, MAX_SCHE_REQUESTS_PUBLIC)
-            config['update_reqs'] = random.choice([2, 3])
-            config['update_reqs'] = min(config['update_reqs'], MAX_UPDATE_REQUESTS)
-        else:
-            p_req = random.randint(50, 65)
-            u_req = random.randint(1, min(MAX_UPDATE_REQUESTS, 3))
-            s_req = min(random.randint(1, 3), MAX_TOTAL_REQUESTS_MUTUAL - p_req - u_req, ELEVATOR_COUNT - u_req*2)
-            s_req = max(0, s_req)
-            p_req = max(1, MAX_TOTAL_REQUESTS_MUTUAL - u_req - s_req)
-            config['passenger_reqs'] = p_req; config['sche_reqs'] = s_req; config['update_reqs'] = u_req;
-        test_configs_to_run.append(config)
-
-    total_tests_to_run = len(test_configs_to_run)
-    print(f"\n开始 {total_tests_to_run} 个 {test_mode.capitalize()} HW7 测试 (批次大小: {MAX_WORKERS})...")
-
-    while tests_completed_count < total_tests_to_run:
-        current_batch_start_index = tests_completed_count + 1; num_tests_in_batch = min(MAX_WORKERS, total_tests_to_run - tests_completed_count)
-        current_batch_end_index = current_batch_start_index + num_tests_in_batch - 1; print(f"\n--- 运行批次: 测试 {current_batch_start_index} 到 {current_batch_end_index} ({test_mode.capitalize()} HW7) ---")
-        batch_start_time = time.time(); futures = []; batch_results_temp = []
-        with concurrent.futures.ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            for i in range(num_tests_in_batch):
-                test_case_index = current_batch_start_index + i; test_config = test_configs_to_run[tests_completed_count + i]
-                future = executor.submit(run_single_test_parallel_subdir, test_case_index, test_config, BASE_DIR, results_dir_path); futures.append(future)
-            print(f"等待批次 (测试 {current_batch_start_index}-{current_batch_end_index}) 完成...")
-            for future in concurrent.futures.as_completed(futures):
+    if CORPUS_SELECT and corpus is not None:
+        select_args = {"mode": test_mode, "limit": total_test_cases, "shuffle": True, **CORPUS_SELECT}
+        try: rows = corpus.select(**select_args)
+        except TypeError as e_select: print_color(f"错误: CORPUS_SELECT 含有 InputCorpus.select 不支持的参数 ({e_select}). 中止测试。", Fore.RED); sys.exit(1)
+        test_configs_to_run = [config_from_row(row) for row in rows]
+        print(f"\n从语料库选取 {len(rows)} 个 {str(select_args['mode']).capitalize()} 输入 (条件: {CORPUS_SELECT})...")
+        if select_args["limit"] and len(rows) < select_args["limit"]:
+            print_color(f"警告: 符合条件的输入只有 {len(rows)} 个, 少于请求的 {select_args['limit']} 个.", Fore.YELLOW)
+    else:
+        print(f"\n准备 {total_test_cases} 个 {test_mode.capitalize()} HW7 测试配置...")
+        for i in range(total_test_cases):
+            test_configs_to_run.append(make_test_config(test_mode))
+
+    total_tests_to_run = len(test_configs_to_run); estimated_by_index = {}
+    pipeline = InputPipeline(enumerate(test_configs_to_run, 1), results_dir_path / INPUTS_DIRNAME, prepare_input,
+                             make_duration_estimator(BASE_DIR / DB_FILENAME if history is not None else None) if LEF_SCHEDULING_ENABLED else None,
+                             longest_first=LEF_SCHEDULING_ENABLED,
+                             on_error=lambda idx, e: print_color(f"警告: 生成测试 {idx} 的输入失败: {e}", Fore.YELLOW))
+    print(f"\n开始 {total_tests_to_run} 个 {test_mode.capitalize()} HW7 测试 (并行数: {MAX_WORKERS}, {'最长优先' if LEF_SCHEDULING_ENABLED else '按序'}调度)...")
+    if injector is not None: injector.start()
+    pipeline.start()
+
+    with make_test_executor(MAX_WORKERS) as executor:
+        in_flight = {}
+        while True:
+            while len(in_flight) < MAX_WORKERS: # 有空闲 worker 时才取下一个已生成的输入, 使调度决定尽可能晚
+                item = pipeline.take()
+                if item is None: break
+                test_case_index, test_config, estimate = item
+                test_configs_to_run[test_case_index - 1] = test_config; estimated_by_index[test_case_index] = estimate
+                in_flight[executor.submit(run_single_test_parallel_subdir, test_case_index, test_config, BASE_DIR, results_dir_path)] = test_case_index
+            if not in_flight: break
+            done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                 future_index = in_flight.pop(future)
                  try:
-                    result = future.result(); batch_results_temp.append(result)
+                    result = future.result()
+                    if injector is not None: result['contention'] = injector.describe()
+                    if estimated_by_index.get(result['index']) is not None: result['estimated_duration'] = estimated_by_index[result['index']]
+                    all_results.append(result); campaign_stats.add_result(result)
+                    if history is not None:
+                        try: history.record_result(campaign_id, result, test_configs_to_run[result['index'] - 1])
+                        except Exception as e_db: print_color(f"警告: 写入历史库失败: {e_db}", Fore.YELLOW)
+                    test_config = test_configs_to_run[result['index'] - 1]
+                    if corpus is not None and CORPUS_SAVE_ENABLED and test_config.get('stdin_file') and pathlib.Path(test_config['stdin_file']).exists():
+                        try:
+                            corpus.add(test_config['stdin_file'], mode=test_mode, seed=test_config.get('seed'), tags=[] if result.get('status') == 'PASS' else ["failed", result.get('status', 'UNKNOWN').lower()],
+                                       profile="corpus" if test_config.get('corpus_sha') else GENERATOR_PROFILE, source=f"{test_mode} 测试 {result['index']}")
+                        except Exception as e_corpus: print_color(f"警告: 写入输入语料库失败: {e_corpus}", Fore.YELLOW)
                     status_color = Fore.GREEN if result.get('status') == 'PASS' else Fore.RED; print_color(f"  测试 {result.get('index', '?')} ({result.get('type','?')}) 完成，最终状态: {result.get('status', 'UNKNOWN')}", status_color)
                     if result.get('status') == 'PASS':
                         perf = result.get('performance');
                         if perf: print(f"    性能 (测试 {result.get('index')}) - 实时: {result.get('real_time_taken', -1.0):.3f}s:"); t_run=perf.get('T_run',float('inf')); wt=perf.get('WT',float('inf')); w=perf.get('W',float('inf')); wt_s=f"{wt:.3f}" if wt!=float('inf') else "Inf"; w_s=f"{w:.2f}" if w!=float('inf') else "Inf"; print(f"      T_run:{t_run:.3f}s, WT:{wt_s}, W:{w_s} (Arr:{perf.get('Arrives',0)}, Op:{perf.get('Opens',0)}, Cl:{perf.get('Closes',0)})")
-                 except Exception as e_future: print_color(f"检索测试结果时出错: {e_future}", Fore.RED); err_idx = f"{current_batch_start_index + len(batch_results_temp)}?"; tb_str_future = traceback.format_exc(); batch_results_temp.append({"index":err_idx,"type":test_mode,"status":"FAIL_FUTURE_ERROR","errors":[f"Future Error: {e_future}\n{tb_str_future}"],"stderr":"","real_time_taken":-1})
-        batch_end_time = time.time(); print(f"--- 批次完成于 {batch_end_time - batch_start_time:.2f} 秒 ---"); all_results.extend(batch_results_temp); tests_completed_count += num_tests_in_batch
+                        baseline = result.get('baseline')
+                        if perf and baseline:
+                            parts = []
+                            for metric in ("T_run", "WT", "W"):
+                                best, strategy = best_baseline(baseline, metric)
+                                if best: parts.append(f"{metric}:{best:.3f} ({strategy}, 本程序为其 {perf.get(metric, float('inf')) / best:.2f} 倍)")
+                            if parts: print(f"      基线最优 - " + ", ".join(parts))
+                        ratios = bound_ratios(perf, result.get('bounds'))
+                        if ratios: print(f"      理论下界之比 - " + ", ".join(f"{metric}:{ratio:.2f}" for metric, ratio in ratios.items()))
+                 except Exception as e_future: print_color(f"检索测试结果时出错: {e_future}", Fore.RED); err_idx = f"{future_index}?"; tb_str_future = traceback.format_exc(); all_results.append({"index":err_idx,"type":test_mode,"status":"FAIL_FUTURE_ERROR","errors":[f"Future Error: {e_future}\n{tb_str_future}"],"stderr":"","real_time_taken":-1})
+                 tests_completed_count += 1
+                 if tests_completed_count % MAX_WORKERS == 0 or tests_completed_count == total_tests_to_run:
+                     print_color(f"--- 已完成 {tests_completed_count}/{total_tests_to_run} ({time.time() - overall_start_time:.0f}s), 累计统计: {campaign_stats.live_line(test_mode)} ---", Fore.CYAN)
 
+    if injector is not None: injector.stop()
     overall_end_time = time.time()
+    if history is not None: history.finish_campaign(campaign_id, overall_end_time - overall_start_time); history.close()
+    if corpus is not None: corpus.close()
+    stray_processes = reap_stray_processes(BASE_DIR, TEST_SUBDIR_PREFIX, [OFFICIAL_JAR_FILE.name, MAIN_CLASS_NAME])
+    if stray_processes:
+        print_color(f"\n警告: 发现并清理了 {len(stray_processes)} 个残留测试进程:", Fore.YELLOW)
+        for pid, cmdline in stray_processes: print_color(f"  PID {pid}: {cmdline[:120]}", Fore.YELLOW)
+    else: print("\n残留进程检查: 无残留 JVM/投喂进程。")
     print(f"\n所有 {total_tests_to_run} 个测试完成。总执行时间: {overall_end_time - overall_start_time:.2f} 秒。")
+    durations_in_order = [r['real_time_taken'] for r in sorted((r for r in all_results if isinstance(r.get('index'), int)), key=lambda r: r['index'])
+                          if r.get('real_time_taken', -1) >= 0]
+    if durations_in_order:
+        print(f"按实际耗时估算: 按序分批约需 {simulate_makespan(durations_in_order, MAX_WORKERS, MAX_WORKERS):.0f}s, "
+              f"最长优先 (已知耗时) 约需 {simulate_makespan(sorted(durations_in_order, reverse=True), MAX_WORKERS):.0f}s")
 
     total_passed_count = 0; total_failed_tests_summary = []
     all_results.sort(key=lambda x: x.get("index", float('inf')))
@@ -299,16 +806,40 @@ if __name__ == "__main__":
     print_color(f"总执行测试数: {len(all_results)}", Style.BRIGHT); print_color(f"通过: {total_passed_count}", Fore.GREEN)
     failed_count = len(total_failed_tests_summary); print_color(f"失败: {failed_count}", Fore.RED if failed_count > 0 else Fore.WHITE)
     if total_failed_tests_summary:
+        failure_clusters = cluster_failures(total_failed_tests_summary, results_dir_path)
+        save_clusters(failure_clusters, results_dir_path / FAILURE_CLUSTERS_FILENAME)
+        print(f"\n--- 失败签名聚类 ({len(failure_clusters)} 类, 详见 {FAILURE_CLUSTERS_FILENAME}) ---")
+        for cluster in failure_clusters:
+            parts = cluster["parts"]
+            print_color(f"  [{cluster['count']:>4}x] {parts['status']} / {parts['kind']} / 事件 {parts['event']} / 状态 {parts['state']}", Fore.RED)
+            if parts["template"]: print(f"         {parts['template'][:150]}")
+            if cluster["representative"]: print(f"         最小代表输入: {results_dir_path.name}{os.sep}{cluster['representative']} ({cluster['representative_size']} 条请求)")
+    if total_failed_tests_summary and failed_count <= SUMMARY_DETAIL_LIMIT:
         print("\n--- 失败测试详情 ---")
-        reason_map = { "FAIL_VALIDATE": "验证错误", "FAIL_TIMEOUT": "超时", "FAIL_RUNTIME": "运行时错误", "FAIL_JAVA_ERROR": "Java错误(非0退出)", "FAIL_STDERR_OUTPUT": "Stderr非空", "FAIL_GENERATE": "数据生成错误", "FAIL_SETUP": "设置错误", "FAIL_WRAPPER_ERROR": "包装器错误(见日志)", "FAIL_FUTURE_ERROR": "并行错误(见日志)", "FAIL_VALIDATE_RECHECK": "重新验证失败(见日志)", "FAIL_PERF_CALC_ERROR": "性能计算出错(见日志)", "FAIL_UNKNOWN": "未知" }
+        reason_map = { "FAIL_VALIDATE": "验证错误", "FAIL_TIMEOUT": "超时", "FAIL_DEADLOCK": "死锁(输出停滞)", "FAIL_RUNTIME": "运行时错误", "FAIL_JAVA_ERROR": "Java错误(非0退出)", "FAIL_STDERR_OUTPUT": "Stderr非空", "FAIL_RESOURCE_LIMIT": "触及资源上限", "FAIL_GENERATE": "数据生成错误", "FAIL_SETUP": "设置错误", "FAIL_WRAPPER_ERROR": "包装器错误(见日志)", "FAIL_FUTURE_ERROR": "并行错误(见日志)", "FAIL_VALIDATE_RECHECK": "重新验证失败(见日志)", "FAIL_PERF_CALC_ERROR": "性能计算出错(见日志)", "FAIL_UNKNOWN": "未知" }
         for failure in total_failed_tests_summary:
              idx = failure.get("index", "?"); ftype = failure.get("type", "?"); code = failure.get("status", "FAIL_UNKNOWN"); reason_str = reason_map.get(code, code)
              print_color(f"  测试 {idx} ({ftype}): {reason_str}", Fore.RED); print(f"      输入:  {results_dir_path.name}{os.sep}failed_data_{idx}_{ftype}.txt"); print(f"      输出/日志: {results_dir_path.name}{os.sep}failed_stdout_{idx}_{ftype}.txt")
-             errors = failure.get("errors", []); stderr_content = failure.get('stderr','')
-             if code == "FAIL_TIMEOUT": print(f"      超时时间: {TIMEOUT_SECONDS_MUTUAL if ftype=='mutual' else TIMEOUT_SECONDS_PUBLIC}s")
+             errors = failure.get("errors", []); stderr_content = failure.get('stderr',''); lines = []
+             if code == "FAIL_TIMEOUT": print(f"      超时时间: {failure.get('timeout_seconds', TIMEOUT_SECONDS_MUTUAL if ftype=='mutual' else TIMEOUT_SECONDS_PUBLIC):.0f}s")
              elif errors: print(f"      关键错误: {errors[0][:150]}...");
+             for summary_line in failure.get("thread_dump_summary", [])[:3]: print(f"      线程转储: {summary_line}")
              if code == "FAIL_VALIDATE_RECHECK" and len(errors) > 1: print(f"      重验证首个错误: {errors[1][:150]}...")
              elif stderr_content.strip(): lines = [line for line in stderr_content.splitlines() if line.strip()];
              if lines: print(f"      Stderr 提示: ...{lines[-1][-100:]}")
+    print("\n--- 性能统计 (均值 ±95% 置信区间, 流式分位数) ---")
+    for line in campaign_stats.format_table(): print(line)
+    for line in campaign_stats.format_elevator_table(): print(line)
+    for line in campaign_stats.format_latency_table(): print(line)
+    for line in campaign_stats.format_special_table(): print(line)
+    for line in campaign_stats.format_timing_table(): print(line)
+    campaign_stats.save_json(results_dir_path / CAMPAIGN_STATS_FILENAME)
     print("="* (50 + len(test_mode)))
+    if FLAKY_RERUN_ENABLED and total_failed_tests_summary:
+        from flaky_rerun import rerun_failures, print_flaky_report, save_flaky_report
+        failures_by_input = {f"failed_data_{failure.get('index')}_{failure.get('type')}.txt": failure for failure in total_failed_tests_summary}
+        flaky_targets = [failures_by_input[cluster["representative"]] for cluster in failure_clusters
+                         if cluster["representative"] in failures_by_input] # 每个签名类只重跑最小的代表输入
+        flaky_reports = rerun_failures(flaky_targets, results_dir_path)
+        print_flaky_report(flaky_reports); save_flaky_report(flaky_reports, results_dir_path)
     print(f"\n测试运行完成。请检查 '{RESULTS_DIR_NAME}' 目录获取失败详情。")
\ No newline at end of file
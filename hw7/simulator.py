@@ -0,0 +1,243 @@
+import heapq
+import time
+import pathlib
+import argparse
+
+from validator import (OutputValidator, MOVE_TIME_DEFAULT, DOUBLE_CAR_SPEED, DOOR_TIME,
+                       MAX_CAPACITY, FLOOR_MIN, ELEVATOR_COUNT, SCHE_HOLD_TIME, UPDATE_HOLD_TIME)
+
+STRATEGIES = ("look", "nearest", "priority")
+MAX_SIM_EVENTS = 500000 # 防止策略缺陷导致死循环
+FLOOR_COUNT = 11 # B4..B1, F1..F7, 内部用 0..10 的连续下标
+
+def floor_index(floor):
+    return floor - FLOOR_MIN if floor < 0 else floor - FLOOR_MIN - 1
+
+class SimPassenger:
+    __slots__ = ("id", "priority", "request_time", "to", "location", "elevator", "finish_time")
+    def __init__(self, pid, priority, request_time, from_idx, to_idx):
+        self.id = pid; self.priority = priority; self.request_time = request_time
+        self.to = to_idx; self.location = from_idx; self.elevator = None; self.finish_time = None
+
+class SimElevator:
+    def __init__(self, eid):
+        self.id = eid; self.pos = floor_index(1); self.direction = 0; self.speed = MOVE_TIME_DEFAULT
+        self.lo = 0; self.hi = FLOOR_COUNT - 1; self.transfer = None; self.partner = None
+        self.inside = []; self.assigned = set(); self.mode = "normal"; self.special = None
+        self.wake_pending = False; self.blocked = False
+
+    def reaches(self, index):
+        return self.lo <= index <= self.hi
+
+    def stop_for(self, p):
+        """乘客在本电梯内应下车的楼层: 目的地, 或 (双轿厢且目的地不在范围内时) 换乘层"""
+        return p.to if self.reaches(p.to) else self.transfer
+
+class Simulator:
+    """离散事件基线模拟器: 与评测相同的输入语义 (RECEIVE 分配, 容量, 开关门, SCHE, UPDATE 双轿厢与换乘层互斥),
+    电梯按 LOOK 运行, strategy 决定乘客分配 (look / nearest / priority)"""
+    def __init__(self, raw_requests, priorities, strategy="look"):
+        if strategy not in STRATEGIES: raise ValueError(f"未知策略: {strategy}")
+        self.strategy = strategy; self.requests = raw_requests; self.priorities = priorities
+        self.elevators = {i: SimElevator(i) for i in range(1, ELEVATOR_COUNT + 1)}
+        self.passengers = {}; self.pending = []; self.heap = []; self.seq = 0
+        self.arrives = 0; self.opens = 0; self.closes = 0; self.last_time = 0.0
+
+    def _push(self, t, kind, payload):
+        self.seq += 1; heapq.heappush(self.heap, (t, self.seq, kind, payload))
+
+    def _wake(self, el, t):
+        if not el.wake_pending: el.wake_pending = True; self._push(t, "wake", el.id)
+
+    def _cost(self, el, p):
+        distance = abs(el.pos - p.location)
+        if self.strategy == "nearest": return distance * el.speed + 0.01 * (len(el.inside) + len(el.assigned))
+        if el.direction != 0 and (p.location - el.pos) * el.direction < 0:
+            stops = [el.stop_for(q) for q in el.inside] + [q.location for q in el.assigned]
+            ahead = [s for s in stops if (s - el.pos) * el.direction > 0]
+            if ahead:
+                extreme = max(ahead) if el.direction > 0 else min(ahead)
+                distance = abs(extreme - el.pos) + abs(extreme - p.location)
+        committed = len(el.inside) + len(el.assigned)
+        cost = distance * el.speed + DOOR_TIME * len({el.stop_for(q) for q in el.inside} | {q.location for q in el.assigned})
+        if committed >= MAX_CAPACITY: cost += DOOR_TIME * 4 * (committed - MAX_CAPACITY + 1)
+        if self.strategy == "priority":
+            committed_priority = sum(q.priority for q in el.inside) + sum(q.priority for q in el.assigned)
+            cost *= 1 + committed_priority / (100.0 * p.priority)
+        return cost
+
+    def _dispatch(self, p, t):
+        candidates = [el for el in self.elevators.values() if el.mode == "normal" and el.reaches(p.location)]
+        direct = [el for el in candidates if el.reaches(p.to)]
+        candidates = direct or [el for el in candidates if el.transfer is not None and el.transfer != p.location]
+        if not candidates: self.pending.append(p); return
+        el = min(candidates, key=lambda e: (self._cost(e, p), e.id))
+        el.assigned.add(p); p.elevator = el; self._wake(el, t)
+
+    def _release_assigned(self, el, t):
+        released = list(el.assigned); el.assigned.clear()
+        for p in released: p.elevator = None; self._dispatch(p, t)
+
+    def _retry_pending(self, t):
+        pending = self.pending; self.pending = []
+        for p in pending: self._dispatch(p, t)
+
+    def _drop(self, el, p, t):
+        """乘客在当前楼层下车: 到达目的地则完成, 否则 (OUT-F) 重新分配"""
+        el.inside.remove(p)
+        if p.to == el.pos: p.finish_time = t
+        else: p.location = el.pos; p.elevator = None; self._dispatch(p, t)
+
+    def _finish(self, t):
+        self.last_time = max(self.last_time, t)
+
+    def _step(self, el, t):
+        if el.mode == "sche": return self._step_sche(el, t)
+        if el.mode == "update": return self._step_update(el, t)
+        leaving = [p for p in el.inside if el.stop_for(p) == el.pos]
+        boarding = [p for p in el.assigned if p.location == el.pos]
+        room = MAX_CAPACITY - len(el.inside) + len(leaving)
+        if leaving or (boarding and room > 0):
+            self.opens += 1; self.closes += 1
+            for p in leaving: self._drop(el, p, t)
+            boarding.sort(key=(lambda q: -q.priority) if self.strategy == "priority" else (lambda q: q.request_time))
+            for p in boarding[:room]: el.assigned.discard(p); el.inside.append(p)
+            self._finish(t + DOOR_TIME); self._wake(el, t + DOOR_TIME); return
+        targets = [el.stop_for(p) for p in el.inside] + [p.location for p in el.assigned if p.location != el.pos]
+        if not targets:
+            el.direction = 0
+            partner = self.elevators.get(el.partner)
+            if el.pos == el.transfer and partner is not None and partner.blocked: # 让出换乘层
+                self._move(el, t, 1 if el.lo == el.transfer else -1)
+            return
+        up = [s for s in targets if s > el.pos]; down = [s for s in targets if s < el.pos]
+        if el.direction > 0 and up: direction = 1
+        elif el.direction < 0 and down: direction = -1
+        elif self.strategy == "priority" and up and down:
+            weight = lambda stops: sum(self._stop_priority(el, s) for s in stops)
+            direction = 1 if weight(up) >= weight(down) else -1
+        else: direction = 1 if up and (not down or len(up) >= len(down)) else -1
+        el.direction = direction
+        self._move(el, t, direction)
+
+    def _stop_priority(self, el, stop):
+        return sum(p.priority for p in el.inside if el.stop_for(p) == stop) + sum(p.priority for p in el.assigned if p.location == stop)
+
+    def _move(self, el, t, direction):
+        nxt = el.pos + direction
+        partner = self.elevators.get(el.partner)
+        if nxt == el.transfer and partner is not None and partner.pos == el.transfer:
+            el.blocked = True
+            if not partner.wake_pending: self._wake(partner, t)
+            el.wake_pending = True; self._push(t + el.speed, "wake", el.id); return
+        el.blocked = False; el.pos = nxt; self.arrives += 1
+        self._finish(t + el.speed); el.wake_pending = True; self._push(t + el.speed, "wake", el.id)
+
+    def _step_sche(self, el, t):
+        info = el.special
+        if el.pos != info["target"]:
+            el.pos += 1 if info["target"] > el.pos else -1; self.arrives += 1
+            self._finish(t + info["speed"]); el.wake_pending = True; self._push(t + info["speed"], "wake", el.id); return
+        self.opens += 1; self.closes += 1
+        for p in list(el.inside): self._drop(el, p, t)
+        end = t + SCHE_HOLD_TIME; self._finish(end)
+        self._push(end, "resume", el.id) # 保持开门 SCHE_HOLD_TIME 后结束调度
+
+    def _step_update(self, el, t):
+        if el.inside:
+            self.opens += 1; self.closes += 1
+            for p in list(el.inside): self._drop(el, p, t)
+            self._finish(t + DOOR_TIME); self._wake(el, t + DOOR_TIME); return
+        el.special["ready"] = True
+        info = el.special; partner = self.elevators[info["partner"]]
+        if partner.mode == "update" and partner.special.get("ready"):
+            end = t + UPDATE_HOLD_TIME; self._finish(end)
+            self._push(end, "update_end", (info["upper"], info["lower"], info["target"]))
+
+    def _update_end(self, upper_id, lower_id, target, t):
+        upper = self.elevators[upper_id]; lower = self.elevators[lower_id]
+        for el, partner in ((upper, lower_id), (lower, upper_id)):
+            el.mode = "normal"; el.special = None; el.speed = DOUBLE_CAR_SPEED; el.direction = 0
+            el.transfer = target; el.partner = partner; el.blocked = False
+        upper.lo, upper.hi, upper.pos = target, FLOOR_COUNT - 1, min(target + 1, FLOOR_COUNT - 1)
+        lower.lo, lower.hi, lower.pos = 0, target, max(target - 1, 0)
+        self._retry_pending(t)
+
+    def run(self):
+        for req in self.requests: self._push(req['time'], "request", req)
+        events = 0
+        while self.heap:
+            t, _, kind, payload = heapq.heappop(self.heap); events += 1
+            if events > MAX_SIM_EVENTS: raise RuntimeError(f"模拟事件数超过 {MAX_SIM_EVENTS}, 策略 {self.strategy} 可能陷入循环")
+            if kind == "wake":
+                el = self.elevators[payload]; el.wake_pending = False; self._step(el, t)
+            elif kind == "resume":
+                el = self.elevators[payload]; el.mode = "normal"; el.special = None; el.speed = MOVE_TIME_DEFAULT; el.direction = 0
+                self._retry_pending(t); self._wake(el, t)
+            elif kind == "update_end":
+                self._update_end(*payload, t)
+                for eid in payload[:2]: self._wake(self.elevators[eid], t)
+            else: self._handle_request(payload, t)
+        return self.metrics()
+
+    def _handle_request(self, req, t):
+        if req['type'] == 'p':
+            p = SimPassenger(req['id'], self.priorities.get(req['id'], 1), t, floor_index(req['from']), floor_index(req['to']))
+            self.passengers[p.id] = p; self._dispatch(p, t)
+        elif req['type'] == 's':
+            el = self.elevators[req['eid']]
+            el.mode = "sche"; el.special = {"target": floor_index(req['tfl']), "speed": req['spd']}
+            self._release_assigned(el, t); self._wake(el, t)
+        elif req['type'] == 'u':
+            info = {"upper": req['e_a'], "lower": req['e_b'], "target": floor_index(req['tfl'])}
+            for eid, partner in ((req['e_a'], req['e_b']), (req['e_b'], req['e_a'])):
+                el = self.elevators[eid]; el.mode = "update"; el.special = dict(info, partner=partner, ready=False)
+            for eid in (req['e_a'], req['e_b']):
+                el = self.elevators[eid]; self._release_assigned(el, t); self._wake(el, t)
+
+    def metrics(self):
+        """与 OutputValidator.calculate_performance 相同的指标"""
+        total_weighted = 0.0; total_priority = 0; unfinished = 0
+        for p in self.passengers.values():
+            if p.finish_time is None: unfinished += 1; continue
+            total_weighted += (p.finish_time - p.request_time) * p.priority; total_priority += p.priority
+        wt = total_weighted / total_priority if total_priority else (float('inf') if self.passengers else 0.0)
+        return {"T_run": self.last_time, "WT": wt, "W": self.arrives * 0.4 + self.opens * 0.1 + self.closes * 0.1,
+                "Arrives": self.arrives, "Opens": self.opens, "Closes": self.closes, "Unfinished": unfinished}
+
+def load_requests(stdin_path):
+    """用 OutputValidator.parse_stdin 解析输入, 返回 (raw_requests, {pid: priority})"""
+    validator = OutputValidator(stdin_path)
+    return validator.raw_requests, {pid: p.priority for pid, p in validator.passengers.items()}
+
+def simulate(stdin_path, strategy="look"):
+    raw_requests, priorities = load_requests(stdin_path)
+    return Simulator(raw_requests, priorities, strategy).run()
+
+def simulate_all(stdin_path, strategies=STRATEGIES):
+    """对同一输入运行所有基线策略, 返回 {策略: 指标}"""
+    raw_requests, priorities = load_requests(stdin_path)
+    return {strategy: Simulator(raw_requests, priorities, strategy).run() for strategy in strategies}
+
+def best_baseline(baselines, metric):
+    """各策略中该指标的最优值 (越小越好) 及对应策略; 有乘客未送达的策略不参与 (WT 只对已送达乘客平均, 丢下难送的乘客反而显得更优)"""
+    finite = [(m[metric], s) for s, m in baselines.items()
+              if not m.get("Unfinished") and m.get(metric) is not None and m[metric] != float('inf')]
+    return min(finite) if finite else (None, None)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HW7 离散事件基线模拟器 (LOOK / nearest / priority)")
+    parser.add_argument("inputs", nargs="+", help="stdin 格式的输入文件")
+    parser.add_argument("--strategy", choices=STRATEGIES + ("all",), default="all")
+    args = parser.parse_args()
+    strategies = STRATEGIES if args.strategy == "all" else (args.strategy,)
+    start = time.perf_counter(); count = 0
+    for input_path in args.inputs:
+        print(f"{pathlib.Path(input_path).name}:")
+        for strategy, m in simulate_all(input_path, strategies).items():
+            count += 1
+            unfinished = f"  未完成 {m['Unfinished']}" if m['Unfinished'] else ""
+            print(f"  {strategy:<9} T_run {m['T_run']:8.3f}  WT {m['WT']:8.3f}  W {m['W']:8.2f}  "
+                  f"(Arr {m['Arrives']}, Op {m['Opens']}, Cl {m['Closes']}){unfinished}")
+    elapsed = time.perf_counter() - start
+    print(f"\n{count} 次模拟, 用时 {elapsed:.3f}s ({count / elapsed if elapsed else 0:.0f} 次/秒)")
@@ -0,0 +1,174 @@
+import os
+import re
+import shutil
+import signal
+import argparse
+import subprocess
+from collections import Counter
+
+IS_WINDOWS = (os.name == 'nt')
+
+THREAD_HEADER_RE = re.compile(r'^"(?P<name>[^"]*)"(?P<rest>.*\b(?:prio|tid)=.*)$') # 只接受带 prio=/tid= 的线程头, 死锁报告中的 "Thread-0": 不算
+DEADLOCK_TRAILER_RE = re.compile(r'^Found (?:one Java-level deadlock|\d+ deadlocks?)') # 转储末尾的死锁报告, 其中会重复列出相关线程
+THREAD_STATE_RE = re.compile(r'^\s*java\.lang\.Thread\.State:\s*(?P<state>\w+)')
+WAIT_LOCK_RE = re.compile(r'^\s*- (?:waiting to lock|parking to wait for)\s+<(?P<addr>0x[0-9a-fA-F]+)>\s*(?:\(a (?P<cls>[^)]*)\))?')
+HELD_LOCK_RE = re.compile(r'^\s*- locked\s+<(?P<addr>0x[0-9a-fA-F]+)>\s*(?:\(a (?P<cls>[^)]*)\))?')
+OWNABLE_RE = re.compile(r'^\s*- <(?P<addr>0x[0-9a-fA-F]+)>\s*(?:\(a (?P<cls>[^)]*)\))?')
+FIRST_FRAME_RE = re.compile(r'^\s*at\s+(?P<frame>\S+)')
+
+def find_java_pids(process):
+    """查找进程组 (POSIX) 或子进程 (Windows) 中的 java 进程 PID"""
+    pids = []
+    if IS_WINDOWS:
+        try:
+            out = subprocess.run(["wmic", "process", "where", f"(ParentProcessId={process.pid})", "get", "Name,ProcessId", "/format:csv"],
+                                 capture_output=True, text=True, errors='replace', timeout=10).stdout
+        except (OSError, subprocess.SubprocessError):
+            return pids
+        for line in out.splitlines():
+            parts = line.strip().split(",")
+            if len(parts) >= 3 and parts[-2].lower() == "java.exe" and parts[-1].isdigit(): pids.append(int(parts[-1]))
+        return pids
+    if not os.path.isdir("/proc"): return pids
+    for name in os.listdir("/proc"):
+        if not name.isdigit(): continue
+        try:
+            with open(f"/proc/{name}/stat", "r") as f: stat = f.read()
+        except OSError:
+            continue
+        comm = stat[stat.find("(") + 1:stat.rfind(")")]; fields = stat[stat.rfind(")") + 2:].split()
+        if comm == "java" and len(fields) > 2 and int(fields[2]) == process.pid: pids.append(int(name))
+    return pids
+
+def request_thread_dump(pid):
+    """请求 JVM 输出线程转储. POSIX 下发送 SIGQUIT (转储写入 JVM 的 stdout, 返回 None);
+    否则调用 jstack 并直接返回转储文本"""
+    if not IS_WINDOWS:
+        os.kill(pid, signal.SIGQUIT)
+        return None
+    jstack = shutil.which("jstack")
+    if jstack is None: return ""
+    try:
+        return subprocess.run([jstack, "-l", str(pid)], capture_output=True, text=True, errors='replace', timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+def parse_thread_dump(text):
+    """解析 HotSpot 线程转储, 返回 {线程名: {'state', 'waiting_for', 'held', 'top_frame'}}"""
+    threads = {}; current = None; in_ownable = False
+    for line in text.splitlines():
+        if DEADLOCK_TRAILER_RE.match(line): break
+        header = THREAD_HEADER_RE.match(line)
+        if header:
+            current = {'state': None, 'waiting_for': None, 'held': set(), 'top_frame': None}
+            threads[header.group('name')] = current; in_ownable = False
+            continue
+        if current is None: continue
+        if "Locked ownable synchronizers:" in line: in_ownable = True; continue
+        m = THREAD_STATE_RE.match(line)
+        if m: current['state'] = m.group('state'); continue
+        m = FIRST_FRAME_RE.match(line)
+        if m:
+            if current['top_frame'] is None: current['top_frame'] = m.group('frame')
+            continue
+        m = WAIT_LOCK_RE.match(line)
+        if m:
+            if current['waiting_for'] is None: current['waiting_for'] = (m.group('addr'), m.group('cls') or "?")
+            continue
+        m = HELD_LOCK_RE.match(line)
+        if m: current['held'].add(m.group('addr')); continue
+        if in_ownable:
+            m = OWNABLE_RE.match(line)
+            if m: current['held'].add(m.group('addr'))
+    return threads
+
+def find_lock_cycles(threads):
+    """根据 "等待锁 -> 持有者" 构建等待图并找出所有环, 返回 [[(线程名, 等待的锁地址, 锁类型), ...]]"""
+    owner_of = {}
+    for name, info in threads.items():
+        for addr in info['held']: owner_of[addr] = name
+    waits_on = {}
+    for name, info in threads.items():
+        if info['waiting_for'] is None: continue
+        owner = owner_of.get(info['waiting_for'][0])
+        if owner is not None and owner != name: waits_on[name] = owner
+    cycles = []; seen_in_cycle = set()
+    for start in waits_on:
+        path = []; index_of = {}; node = start
+        while node in waits_on and node not in index_of and node not in seen_in_cycle:
+            index_of[node] = len(path); path.append(node); node = waits_on[node]
+        if node in index_of:
+            cycle_nodes = path[index_of[node]:]
+            seen_in_cycle.update(cycle_nodes)
+            cycles.append([(n, threads[n]['waiting_for'][0], threads[n]['waiting_for'][1]) for n in cycle_nodes])
+    return cycles
+
+def summarize_thread_dump(text):
+    """生成线程转储摘要 (线程状态统计, JVM 报告的死锁, 检测到的锁环), 返回字符串列表"""
+    if not text or not text.strip(): return ["未获取到线程转储"]
+    threads = parse_thread_dump(text)
+    summary = []
+    states = Counter(info['state'] or "UNKNOWN" for info in threads.values())
+    summary.append(f"线程数: {len(threads)} (" + ", ".join(f"{s}:{c}" for s, c in sorted(states.items())) + ")")
+    jvm_deadlocks = re.findall(r"Found (\w+) Java-level deadlock", text)
+    if jvm_deadlocks: summary.append(f"JVM 报告 Java 级死锁: {len(jvm_deadlocks)} 处")
+    cycles = find_lock_cycles(threads)
+    for i, cycle in enumerate(cycles, 1):
+        chain = " -> ".join(f"{name}[等待 {cls}@{addr}]" for name, addr, cls in cycle)
+        summary.append(f"锁环 {i}: {chain} -> {cycle[0][0]}")
+    if not cycles:
+        blocked = [f"{name}@{info['top_frame']}" for name, info in threads.items() if info['state'] == "BLOCKED"]
+        if blocked: summary.append("未发现锁环, BLOCKED 线程: " + ", ".join(blocked[:10]))
+        else: summary.append("未发现锁环 (可能为 wait/notify 丢失唤醒或活锁)")
+    return summary
+
+SAMPLE_DEADLOCK_DUMP = """Full thread dump OpenJDK 64-Bit Server VM (17.0.8+7 mixed mode, sharing):
+
+"main" #1 prio=5 os_prio=0 cpu=80.12ms elapsed=12.30s tid=0x00007f1c0802a000 nid=0x1a03 waiting on condition  [0x00007f1c0ffe6000]
+   java.lang.Thread.State: WAITING (parking)
+\tat jdk.internal.misc.Unsafe.park(java.base@17.0.8/Native Method)
+
+"Thread-0" #14 prio=5 os_prio=0 cpu=3.21ms elapsed=12.10s tid=0x00007f1c08190800 nid=0x1a12 waiting for monitor entry  [0x00007f1bd97fe000]
+   java.lang.Thread.State: BLOCKED (on object monitor)
+\tat Elevator.run(Elevator.java:42)
+\t- waiting to lock <0x000000062a0b1c28> (a RequestTable)
+\t- locked <0x000000062a0b1d40> (a Elevator)
+
+"Thread-1" #15 prio=5 os_prio=0 cpu=2.98ms elapsed=12.10s tid=0x00007f1c08191800 nid=0x1a13 waiting for monitor entry  [0x00007f1bd96fd000]
+   java.lang.Thread.State: BLOCKED (on object monitor)
+\tat RequestTable.dispatch(RequestTable.java:77)
+\t- waiting to lock <0x000000062a0b1d40> (a Elevator)
+\t- locked <0x000000062a0b1c28> (a RequestTable)
+
+Found one Java-level deadlock:
+=============================
+"Thread-0":
+  waiting to lock monitor 0x00007f1bd0004e80 (object 0x000000062a0b1c28, a RequestTable),
+  which is held by "Thread-1"
+
+"Thread-1":
+  waiting to lock monitor 0x00007f1bd0007380 (object 0x000000062a0b1d40, a Elevator),
+  which is held by "Thread-0"
+
+Java stack information for the threads listed above:
+===================================================
+"Thread-0":
+\tat Elevator.run(Elevator.java:42)
+\t- waiting to lock <0x000000062a0b1c28> (a RequestTable)
+\t- locked <0x000000062a0b1d40> (a Elevator)
+"Thread-1":
+\tat RequestTable.dispatch(RequestTable.java:77)
+\t- waiting to lock <0x000000062a0b1d40> (a Elevator)
+\t- locked <0x000000062a0b1c28> (a RequestTable)
+
+Found 1 deadlock.
+""" # 含 JVM 死锁报告的 HotSpot 转储示例 (未指定文件时用于检查解析)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HotSpot 线程转储摘要 (未指定文件时解析内置的死锁示例)")
+    parser.add_argument("dump", nargs="?", help="线程转储文本文件 (jstack 输出或 SIGQUIT 写入 stdout 的内容)")
+    args = parser.parse_args()
+    if args.dump:
+        with open(args.dump, "r", encoding='utf-8', errors='replace') as f: dump_text = f.read()
+    else: dump_text = SAMPLE_DEADLOCK_DUMP
+    for summary_line in summarize_thread_dump(dump_text): print(summary_line)
@@ -19,6 +19,15 @@ SCHE_VALID_SPEEDS = {0.2, 0.3, 0.4, 0.5}
 UPDATE_HOLD_TIME = 1.0
 UPDATE_MAX_RESPONSE_TIME = 6.0
 UPDATE_TARGET_FLOORS_SET = {-2, -1, 1, 2, 3, 4, 5}
+MAX_RECORDED_ERRORS = 1000 # 超出后只计数, 避免刷屏输出导致内存无界增长
+DOOR_HISTORY_LIMIT = 64 # 每部电梯每层保留的最近事件数, 供 CLOSE/SCHE-END 回溯对应的 OPEN; 不保存完整事件序列, 内存不随输出行数增长
+UTILISATION_WINDOW_SECONDS = 10.0 # 电梯利用率按时间窗统计的窗口长度
+PRIORITY_BANDS = [(1, 25), (26, 50), (51, 75), (76, 100)] # 按优先级分段统计乘客延迟
+STARVATION_THRESHOLD_SECONDS = 30.0 # 请求到送达超过该时长的乘客列入饥饿名单
+LATENCY_PERCENTILES = (0.5, 0.9, 0.99)
+SPECIAL_STAGES = ["accept_lag", "begin_lag", "exec_time", "response", "margin"] # SCHE/UPDATE 分阶段耗时 (见 special_report)
+TIMING_CHECKS = ["move", "door", "sche_hold", "update_hold"] # 记录时间余量的约束: ARRIVE 间隔, 开门时长, SCHE/UPDATE 保持时间
+TIMING_SLACK_BINS = [0.0, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.5] # 余量直方图各桶下界 (秒), 负余量 (靠容差通过) 单独一桶
 
 DOOR_CLOSED = 0; DOOR_OPEN = 1
 PASSENGER_WAITING = 0; PASSENGER_INSIDE = 1; PASSENGER_ARRIVED = 2
@@ -62,6 +71,15 @@ class PassengerState:
         self.id=id; self.priority=priority; self.from_floor=from_fl; self.to_floor=to_fl;
         self.request_time=req_time; self.finish_time=-1.0; self.current_location=from_fl;
         self.state=PASSENGER_WAITING; self.current_elevator=-1; self.received_by_elevator=-1;
+        self.reset_latency()
+    def reset_latency(self):
+        self.first_in_time=-1.0; self.out_f_count=0; self.elevators_used=[]
+    def latency(self):
+        """(等待: 请求到首次 IN, 乘坐: 首次 IN 到 OUT-S, 总计), 未完成的项为 None"""
+        wait = self.first_in_time - self.request_time if self.first_in_time >= 0 else None
+        ride = self.finish_time - self.first_in_time if self.finish_time >= 0 and self.first_in_time >= 0 else None
+        total = self.finish_time - self.request_time if self.finish_time >= 0 else None
+        return wait, ride, total
     def __repr__(self):
         loc=floor_to_str(self.current_location) if self.state!=PASSENGER_INSIDE else "In"
         st_map={0:"W", 1:"I", 2:"A"}; st=st_map.get(self.state, '?')
@@ -90,19 +108,70 @@ class ElevatorState:
         return (f"E{self.original_id}(@{fl} D:{ds} S:{spd} R:{range_s} St:{ss} {dbl}{part}{shft_info} "
                 f"In:{ps} Rcv:{rps} FinT:{self.last_action_finish_time:.2f})")
 
+class ElevatorUsage:
+    """单部电梯的利用率统计 (移动, 开关门, 空载移动, 载客积分, 忙碌时间, 服务人数, 按时间窗的计数)"""
+    def __init__(self, id):
+        self.id = id; self.moves = 0; self.empty_moves = 0; self.loaded_moves_passengers = 0
+        self.opens = 0; self.closes = 0; self.boardings = 0; self.deliveries = 0; self.transfers_out = 0
+        self.move_time = 0.0; self.door_time = 0.0; self.hold_time = 0.0
+        self.load_integral = 0.0; self.load_since = 0.0; self.load = 0
+        self.open_since = None; self.hold_since = None; self.windows = defaultdict(lambda: [0, 0, 0]) # 窗口 -> [移动, 开门, 送达]
+
+    def track_load(self, t, load):
+        self.load_integral += self.load * max(0.0, t - self.load_since); self.load_since = t; self.load = load
+
+    def to_dict(self, end_time):
+        self.track_load(end_time, self.load)
+        busy = self.move_time + self.door_time + self.hold_time
+        return {"moves": self.moves, "empty_moves": self.empty_moves, "empty_move_ratio": self.empty_moves / self.moves if self.moves else 0.0,
+                "avg_load_moving": self.loaded_moves_passengers / self.moves if self.moves else 0.0,
+                "load_factor": self.load_integral / (MAX_CAPACITY * end_time) if end_time > 0 else 0.0,
+                "opens": self.opens, "closes": self.closes, "boardings": self.boardings, "deliveries": self.deliveries, "transfers_out": self.transfers_out,
+                "energy": self.moves * 0.4 + self.opens * 0.1 + self.closes * 0.1,
+                "busy_time": busy, "idle_time": max(0.0, end_time - busy), "idle_ratio": max(0.0, end_time - busy) / end_time if end_time > 0 else 0.0,
+                "windows": {str(w): counts for w, counts in sorted(self.windows.items())}}
+
+class SlackHistogram:
+    """某一时间约束的余量 (实际耗时 - 最小允许耗时) 直方图; counts[0] 为负余量, counts[i] 对应 [BINS[i-1], BINS[i])"""
+    def __init__(self, counts=None, n=0, min=None, total=0.0):
+        self.counts = list(counts) if counts else [0] * (len(TIMING_SLACK_BINS) + 1)
+        self.n = n; self.min = min; self.total = total
+
+    def add(self, slack):
+        slack = round(slack, 6) + 0.0 # 消除浮点误差, 避免 0 余量落入负桶
+        self.counts[sum(1 for lo in TIMING_SLACK_BINS if slack >= lo)] += 1
+        self.n += 1; self.total += slack; self.min = slack if self.min is None else min(self.min, slack)
+
+    def merge(self, d):
+        """合并另一个直方图的 to_dict() 结果"""
+        if not d or not d.get("n"): return
+        self.counts = [a + b for a, b in zip(self.counts, d["counts"])]
+        self.n += d["n"]; self.total += d["mean"] * d["n"]; self.min = d["min"] if self.min is None else min(self.min, d["min"])
+
+    def to_dict(self):
+        return {"n": self.n, "min": self.min, "mean": self.total / self.n if self.n else None, "counts": self.counts}
+
+    @staticmethod
+    def labels():
+        return ["<0"] + [f"<{hi:g}" for hi in TIMING_SLACK_BINS[1:]] + [f">={TIMING_SLACK_BINS[-1]:g}"]
+
 class OutputValidator:
     def __init__(self, stdin_file):
-        self.errors = []; self.events = []; self.passengers = {}
+        self.errors = []; self.suppressed_errors = 0; self.door_history = {}; self.passengers = {}
         self.elevators = {i: ElevatorState(id=i) for i in range(1, ELEVATOR_COUNT + 1)}
         self.last_global_time = 0.0; self.power_arrive = 0; self.power_open = 0
         self.power_close = 0; self.total_runtime = 0.0; self.raw_requests = []
         self.active_shafts = set(range(1, ELEVATOR_COUNT + 1))
         self.target_floor_managers = {}
+        self.usage = {i: ElevatorUsage(i) for i in range(1, ELEVATOR_COUNT + 1)}
+        self.special_records = []; self.open_specials = {}
+        self.timing_slack = {check: SlackHistogram() for check in TIMING_CHECKS}
         self.parse_stdin(stdin_file)
 
     def add_error(self, message, timestamp=None):
         ts_str = f" (at time ~{timestamp:.4f})" if timestamp is not None else ""
         full_message = f"Validation Error: {message}{ts_str}"
+        if len(self.errors) >= MAX_RECORDED_ERRORS: self.suppressed_errors += 1; return
         if not self.errors or self.errors[-1] != full_message: self.errors.append(full_message)
 
     def parse_stdin(self, filename):
@@ -322,7 +391,7 @@ class OutputValidator:
                 begin_t_a = el_a.update_info.get('begin_time', -1.0); accept_t_a = el_a.update_info.get('accept_time', -1.0)
                 if begin_t_a < 0 or accept_t_a < 0: self.add_error(f"UPDATE-END {e_a_id}-{e_b_id}: 内部错误 - 缺少时间信息", t)
                 else:
-                     hold_time = t - begin_t_a
+                     hold_time = t - begin_t_a; self.timing_slack["update_hold"].add(hold_time - UPDATE_HOLD_TIME)
                      if hold_time < UPDATE_HOLD_TIME - EPSILON*10: self.add_error(f"UPDATE 保持时间 {e_a_id}-{e_b_id} 过短: {hold_time:.4f}s < {UPDATE_HOLD_TIME}s", t)
                      response_time = t - accept_t_a
                      if response_time > UPDATE_MAX_RESPONSE_TIME + EPSILON*10: self.add_error(f"UPDATE 响应时间 {e_a_id}-{e_b_id} 过长: {response_time:.4f}s > {UPDATE_MAX_RESPONSE_TIME}s", t)
@@ -359,6 +428,7 @@ class OutputValidator:
                 if not(f_diff == 1 or cross0) and floor != el.current_floor: self.add_error(f"E{el.original_id} 无效移动 {floor_to_str(el.current_floor)}->{floor_to_str(floor)}",t)
                 if not (el.min_floor <= floor <= el.max_floor): self.add_error(f"E{el.original_id} ARRIVE @{floor_to_str(floor)} 超出范围 [{floor_to_str(el.min_floor)}-{floor_to_str(el.max_floor)}]",t)
                 exp_move_t = el.current_speed; exp_arr_t = el.last_action_finish_time + exp_move_t
+                self.timing_slack["move"].add(t - exp_arr_t)
                 if t < exp_arr_t - EPSILON*20: self.add_error(f"E{el.original_id} ARRIVE @{floor_to_str(floor)} 过早. T:{t:.4f}<Exp:{exp_arr_t:.4f}(Last:{el.last_action_finish_time:.4f},Spd:{el.current_speed:.1f})",t)
                 is_leaving_transfer = False; tf_manager = self.target_floor_managers.get(el.shaft_id) if el.is_double_car else None
                 if el.is_double_car and tf_manager and el.current_floor == tf_manager.transfer_floor and floor != tf_manager.transfer_floor: is_leaving_transfer = True
@@ -397,14 +467,12 @@ class OutputValidator:
                 if floor != el.current_floor: self.add_error(f"E{el.original_id} CLOSE @ 错误楼层 {floor_to_str(floor)} (当前:{floor_to_str(el.current_floor)})",t)
                 min_dur = SCHE_HOLD_TIME if is_at_sche_target else DOOR_TIME
                 open_t = -1.0;
-                for i in range(len(self.events) - 1, -1, -1):
-                    prev = self.events[i];
-                    if prev.get('elevator_id') == el.original_id and prev.get('floor') == floor:
-                        if prev['type'] == 'OPEN': open_t = prev['time']; break
-                        if prev['type'] == 'CLOSE': open_t = -2.0; break
+                for prev in reversed(self.door_history.get((el.original_id, floor), ())):
+                    if prev['type'] == 'OPEN': open_t = prev['time']; break
+                    if prev['type'] == 'CLOSE': open_t = -2.0; break
                 if open_t == -1.0: self.add_error(f"E{el.original_id} CLOSE @{floor_to_str(floor)}: 未找到对应 OPEN",t)
                 elif open_t >= 0:
-                    dur = t - open_t
+                    dur = t - open_t; self.timing_slack["sche_hold" if is_at_sche_target else "door"].add(dur - min_dur)
                     if dur < min_dur - EPSILON*10: mode = "SCHE" if is_at_sche_target else "norm"; self.add_error(f"E{el.original_id} 门 @{floor_to_str(floor)} 开启过短 ({mode}):{dur:.4f}s<{min_dur:.1f}s",t)
                 el.door_state = DOOR_CLOSED; el.action_completed(t); return True
 
@@ -498,17 +566,14 @@ class OutputValidator:
                 acc_t = s_info.get('accept_time', -1.0); comp_t = t - acc_t;
                 if acc_t<0: self.add_error(f"SCHE-END E{el.original_id}: 未找到 Accept 时间",t)
                 elif comp_t > SCHE_MAX_RESPONSE_TIME + EPSILON*10: self.add_error(f"SCHE E{el.original_id} 超时: {comp_t:.4f}s>{SCHE_MAX_RESPONSE_TIME}s",t)
-                fnd_c=False; fnd_o=False; c_t=-1.0; o_t=-1.0; s_idx=len(self.events)-1
-                while s_idx >= 0:
-                    prev=self.events[s_idx];
-                    if prev.get('elevator_id')!=el.original_id or prev.get('floor')!=t_fl: s_idx-=1; continue
+                fnd_c=False; fnd_o=False; c_t=-1.0; o_t=-1.0
+                for prev in reversed(self.door_history.get((el.original_id, t_fl), ())):
                     if not fnd_c and prev['type']=='CLOSE': fnd_c=True; c_t=prev['time'];
                     elif fnd_c and not fnd_o and prev['type']=='OPEN':
                         fnd_o=True; o_t=prev['time']; hold=c_t-o_t;
                         if hold<SCHE_HOLD_TIME-EPSILON*10: self.add_error(f"SCHE 保持时间 E{el.original_id}@{floor_to_str(t_fl)} 过短:{hold:.4f}s<{SCHE_HOLD_TIME}s",t)
                         break
                     elif fnd_c and prev['type'] not in ['OUT','OPEN']: break
-                    s_idx -= 1
                 if not fnd_c or not fnd_o: self.add_error(f"SCHE-END E{el.original_id}: 未找到有效 OPEN/CLOSE({SCHE_HOLD_TIME}s+) 序列 @ Tgt {floor_to_str(t_fl)}",t)
                 el.state = ELEVATOR_IDLE; el.current_speed = MOVE_TIME_DEFAULT; el.schedule_info = {};
                 el.action_completed(t); return True
@@ -520,10 +585,11 @@ class OutputValidator:
         self.add_error(f"未知的事件类型 '{etype}' 无法验证",t); return False
 
 
-    def validate_output(self, output_lines):
-        """HW7 输出验证主函数 """
+    def begin_stream(self):
+        """重置所有状态, 准备逐行验证 (feed_line / finish_stream)"""
         self.errors = []
-        self.events = []
+        self.suppressed_errors = 0
+        self.door_history = {}
         self.last_global_time = 0.0
         self.power_arrive = 0
         self.power_open = 0
@@ -531,6 +597,10 @@ class OutputValidator:
         self.total_runtime = 0.0
         self.active_shafts = set(range(1, ELEVATOR_COUNT + 1))
         self.target_floor_managers = {}
+        self.lines_fed = 0
+        self.usage = {i: ElevatorUsage(i) for i in range(1, ELEVATOR_COUNT + 1)}
+        self.special_records = []; self.open_specials = {}
+        self.timing_slack = {check: SlackHistogram() for check in TIMING_CHECKS}
 
         for el in self.elevators.values():
             el.reset_state()
@@ -542,23 +612,185 @@ class OutputValidator:
                 p.current_elevator = -1
                 p.received_by_elevator = -1
                 p.finish_time = -1.0
+                p.reset_latency()
             except Exception as e_reset_p:
                 self.add_error(f"内部错误: 重置乘客 {p.id} 状态失败: {e_reset_p}")
                 return False
+        return True
+
+    def feed_line(self, line):
+        """解析并验证一行输出, 返回该行对应事件 (无效行返回 None)"""
+        if not line.strip(): return None
+        self.lines_fed += 1
+        event = self.parse_output_line(line)
+        if event and self.validate_event(event):
+            self.record_door_history(event)
+            self.record_usage(event)
+            self.record_passenger(event)
+            self.record_special(event)
+            return event
+        return None
+
+    def record_door_history(self, event):
+        """按 (电梯, 楼层) 保留最近 DOOR_HISTORY_LIMIT 个事件, 回溯开门时长只需同一电梯同一楼层的事件"""
+        elevator_id = event.get('elevator_id'); floor = event.get('floor')
+        if elevator_id is None or floor is None: return
+        history = self.door_history.get((elevator_id, floor))
+        if history is None: history = self.door_history[(elevator_id, floor)] = deque(maxlen=DOOR_HISTORY_LIMIT)
+        history.append(event)
+
+    def record_usage(self, event):
+        """在事件通过验证后更新对应电梯的利用率统计"""
+        etype = event["type"]; t = event["time"]
+        if etype.startswith("UPDATE"):
+            for eid in (event.get("elevator_a_id"), event.get("elevator_b_id")):
+                usage = self.usage.get(eid)
+                if usage is None: continue
+                if etype == "UPDATE-BEGIN": usage.hold_since = t
+                elif etype == "UPDATE-END" and usage.hold_since is not None: usage.hold_time += t - usage.hold_since; usage.hold_since = None
+            return
+        el = self.elevators.get(event.get("elevator_id")); usage = self.usage.get(event.get("elevator_id"))
+        if el is None or usage is None: return
+        window = usage.windows[int(t // UTILISATION_WINDOW_SECONDS)]
+        if etype == "ARRIVE":
+            usage.moves += 1; usage.move_time += el.current_speed; window[0] += 1
+            if el.passenger_count == 0: usage.empty_moves += 1
+            usage.loaded_moves_passengers += el.passenger_count
+        elif etype == "OPEN": usage.opens += 1; usage.open_since = t; window[1] += 1
+        elif etype == "CLOSE":
+            usage.closes += 1
+            if usage.open_since is not None: usage.door_time += t - usage.open_since; usage.open_since = None
+        elif etype == "IN": usage.boardings += 1
+        elif etype == "OUT":
+            if event["success"]: usage.deliveries += 1; window[2] += 1
+            else: usage.transfers_out += 1
+        usage.track_load(t, el.passenger_count)
+
+    def record_passenger(self, event):
+        """在 IN / OUT 事件通过验证后记录乘客的首次进入时间, 乘坐过的电梯与 OUT-F 次数"""
+        p = self.passengers.get(event.get("person_id"))
+        if p is None: return
+        if event["type"] == "IN":
+            if p.first_in_time < 0: p.first_in_time = event["time"]
+            p.elevators_used.append(event["elevator_id"])
+        elif event["type"] == "OUT" and not event["success"]: p.out_f_count += 1
+
+    def _match_special_request(self, kind, key):
+        """找到与 ACCEPT 对应的最早一条未匹配的 SCHE/UPDATE 输入请求, 返回其时间"""
+        used = {r["request_index"] for r in self.special_records}
+        for i, req in enumerate(self.raw_requests):
+            if i in used or req['type'] != kind: continue
+            if (kind == 's' and req['eid'] == key) or (kind == 'u' and (req['e_a'], req['e_b']) == key): return i, req['time']
+        return None, None
+
+    def record_special(self, event):
+        """记录 SCHE/UPDATE 各阶段时间: 输入 -> ACCEPT -> BEGIN -> END, BEGIN 前的 ARRIVE 次数与期间 OUT-F 的乘客数"""
+        etype = event["type"]; t = event["time"]
+        if etype == "SCHE-ACCEPT" or etype == "UPDATE-ACCEPT":
+            kind = 's' if etype == "SCHE-ACCEPT" else 'u'
+            key = event["elevator_id"] if kind == 's' else (event["elevator_a_id"], event["elevator_b_id"])
+            index, input_time = self._match_special_request(kind, key)
+            record = {"kind": "SCHE" if kind == 's' else "UPDATE", "elevators": [key] if kind == 's' else list(key), "request_index": index,
+                      "input_time": input_time, "accept": t, "begin": None, "end": None, "arrives_before_begin": 0, "evicted": 0}
+            self.special_records.append(record)
+            for eid in record["elevators"]: self.open_specials[eid] = record
+            return
+        if etype.startswith("UPDATE") or etype.startswith("SCHE"):
+            eids = [event["elevator_id"]] if etype.startswith("SCHE") else [event["elevator_a_id"], event["elevator_b_id"]]
+            record = self.open_specials.get(eids[0])
+            if record is None: return
+            if etype.endswith("BEGIN"): record["begin"] = t
+            elif etype.endswith("END"):
+                record["end"] = t
+                for eid in eids: self.open_specials.pop(eid, None)
+            return
+        record = self.open_specials.get(event.get("elevator_id"))
+        if record is None: return
+        if etype == "ARRIVE" and record["begin"] is None: record["arrives_before_begin"] += 1
+        elif etype == "OUT" and not event["success"]: record["evicted"] += 1
+
+    def timing_report(self):
+        """各时间约束的余量直方图"""
+        return {check: hist.to_dict() for check, hist in self.timing_slack.items()}
+
+    def special_report(self):
+        """每个 SCHE/UPDATE 的分阶段耗时与距 6s 上限的余量, 及按类型的汇总"""
+        records = []
+        for r in self.special_records:
+            limit = SCHE_MAX_RESPONSE_TIME if r["kind"] == "SCHE" else UPDATE_MAX_RESPONSE_TIME
+            d = dict(r); d.pop("request_index", None)
+            d["accept_lag"] = r["accept"] - r["input_time"] if r["input_time"] is not None else None
+            d["begin_lag"] = r["begin"] - r["accept"] if r["begin"] is not None else None
+            d["exec_time"] = r["end"] - r["begin"] if r["end"] is not None and r["begin"] is not None else None
+            d["response"] = r["end"] - r["accept"] if r["end"] is not None else None
+            d["margin"] = limit - d["response"] if d["response"] is not None else None
+            records.append(d)
+        summary = {}
+        for kind in ("SCHE", "UPDATE"):
+            of_kind = [d for d in records if d["kind"] == kind]
+            if not of_kind: continue
+            summary[kind] = {"count": len(of_kind), "unfinished": sum(1 for d in of_kind if d["end"] is None)}
+            for stage in SPECIAL_STAGES:
+                values = [d[stage] for d in of_kind if d[stage] is not None]
+                if values: summary[kind][stage] = {"mean": sum(values) / len(values), "min": min(values), "max": max(values)}
+        return {"records": records, "summary": summary}
+
+    def latency_report(self, starvation_threshold=STARVATION_THRESHOLD_SECONDS):
+        """按优先级分段的乘客等待/乘坐/总延迟分位数, 换乘统计与饥饿名单 (总延迟超过阈值或未送达)"""
+        def percentiles(values):
+            if not values: return None
+            ordered = sorted(values); d = {"n": len(ordered), "mean": sum(ordered) / len(ordered), "max": ordered[-1]}
+            for q in LATENCY_PERCENTILES: d[f"p{int(round(q * 100))}"] = ordered[min(len(ordered) - 1, int(math.ceil(q * len(ordered))) - 1)]
+            return d
+        bands = {}; starved = []; transfers = 0; out_f = 0
+        for lo, hi in PRIORITY_BANDS:
+            members = [p for p in self.passengers.values() if lo <= p.priority <= hi]
+            latencies = [p.latency() for p in members]
+            bands[f"{lo}-{hi}"] = {"passengers": len(members),
+                                   "wait": percentiles([l[0] for l in latencies if l[0] is not None]),
+                                   "ride": percentiles([l[1] for l in latencies if l[1] is not None]),
+                                   "total": percentiles([l[2] for l in latencies if l[2] is not None])}
+        for p in self.passengers.values():
+            wait, ride, total = p.latency()
+            hops = max(0, len(set(p.elevators_used)) - 1); transfers += hops; out_f += p.out_f_count
+            if total is None or total > starvation_threshold:
+                starved.append({"id": p.id, "priority": p.priority, "request_time": p.request_time, "wait": wait, "ride": ride, "total": total,
+                                "from": floor_to_str(p.from_floor), "to": floor_to_str(p.to_floor), "transfers": hops, "out_f": p.out_f_count})
+        starved.sort(key=lambda d: -(d["total"] if d["total"] is not None else float('inf')))
+        return {"threshold": starvation_threshold, "bands": bands, "transfers": transfers, "out_f": out_f,
+                "passengers_transferred": sum(1 for p in self.passengers.values() if len(set(p.elevators_used)) > 1), "starved": starved}
+
+    def utilisation_report(self):
+        """各电梯利用率与汇总 (空载移动比例, 载客率, 空闲比例, 移动最多电梯的份额)"""
+        end_time = self.total_runtime
+        elevators = {eid: usage.to_dict(end_time) for eid, usage in self.usage.items()}
+        total_moves = sum(d["moves"] for d in elevators.values())
+        summary = {"window_seconds": UTILISATION_WINDOW_SECONDS,
+                   "empty_move_ratio": sum(d["empty_moves"] for d in elevators.values()) / total_moves if total_moves else 0.0,
+                   "load_factor": sum(d["load_factor"] for d in elevators.values()) / len(elevators),
+                   "idle_ratio": sum(d["idle_ratio"] for d in elevators.values()) / len(elevators),
+                   "move_share_max": max(d["moves"] for d in elevators.values()) / total_moves if total_moves else 0.0}
+        return {"summary": summary, "elevators": elevators}
 
+    @property
+    def last_request_time(self):
+        return self.raw_requests[-1]['time'] if self.raw_requests else 0.0
+
+    def stall_state(self):
+        """流式验证中判断是否处于"可能死锁"状态: 仍有乘客未到达且没有电梯处于 SCHE/UPDATE 执行中.
+        返回 (是否停滞, 描述)"""
+        pending = [p for p in self.passengers.values() if p.state != PASSENGER_ARRIVED]
+        if not pending: return False, "所有乘客已到达"
+        busy = [el for el in self.elevators.values() if el.state in (ELEVATOR_SCHEDULING_ACTIVE, ELEVATOR_UPDATING_ACTIVE)]
+        if busy: return False, f"电梯执行中: {', '.join(f'E{el.original_id}' for el in busy)}"
+        waiting = sum(1 for p in pending if p.state == PASSENGER_WAITING); inside = len(pending) - waiting
+        return True, f"{len(pending)} 名乘客未到达 (等待 {waiting}, 电梯内 {inside})"
+
+    def finish_stream(self):
+        """流式验证结束, 执行最终状态检查并返回是否通过"""
         if not self.passengers and self.errors: return False
-        elif not self.passengers and not output_lines: return True
-        elif not self.passengers and output_lines: self.add_error("无请求但有输出"); return False
-
-        parsed_events_raw = []
-        for line in output_lines:
-            event = self.parse_output_line(line)
-            if event: parsed_events_raw.append(event)
-
-        self.events = []
-        for event in parsed_events_raw:
-            if self.validate_event(event):
-                self.events.append(event)
+        elif not self.passengers and self.lines_fed == 0: return True
+        elif not self.passengers: self.add_error("无请求但有输出"); return False
 
         print(f"\n--- 最终状态检查 (HW7 v{self.get_version()}) ---") #<--- 使用版本号
         final_errors = []
@@ -585,8 +817,16 @@ class OutputValidator:
 
         print(f"电梯检查: {'OK' if all_e_ok else 'FAILED'}")
         for msg in final_errors: self.add_error(f"最终状态错误: {msg}")
+        if self.suppressed_errors: self.errors.append(f"Validation Error: 另有 {self.suppressed_errors} 条错误未记录 (上限 {MAX_RECORDED_ERRORS})")
         return not self.errors
 
+    def validate_output(self, output_lines):
+        """HW7 输出验证主函数 """
+        if not self.begin_stream(): return False
+        for line in output_lines:
+            self.feed_line(line)
+        return self.finish_stream()
+
 
     def calculate_performance(self, real_time):
         """计算 HW7 性能"""